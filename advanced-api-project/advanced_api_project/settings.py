@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -61,6 +62,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'advanced_api_project.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -136,3 +138,26 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds BookListView keeps a cached COUNT(*) per filter combination
+BOOK_COUNT_CACHE_TIMEOUT = 300
+
+# Number of books BookBulkView validates and writes per transaction
+BOOK_BULK_CHUNK_SIZE = 500
+
+# Per-request SQL instrumentation (see advanced_api_project/middleware.py):
+# query count and DB time in the Server-Timing header and the log
+QUERY_INSTRUMENTATION = DEBUG
+
+# Raise instead of logging a warning when a view exceeds its query budget
+QUERY_BUDGET_STRICT = 'test' in sys.argv
@@ -0,0 +1,187 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Query parameters that change which books BookListView returns. Anything
+# else (ordering, cursor, page_size, ...) does not change the count.
+COUNT_FILTER_PARAMS = [
+    'id',
+    'title',
+    'author__name',
+    'publication_year',
+    'search',
+    'year_from',
+    'year_to',
+]
+
+# Filters matched word by word and case-insensitively (the full-text
+# search), so "Orwell" and " orwell " can share a cache entry. The other
+# filters are exact: "A  B" and "A B" match different books.
+WORD_PARAMS = ['search']
+
+
+def get_count_cache_timeout():
+    return getattr(settings, 'BOOK_COUNT_CACHE_TIMEOUT', 300)
+
+
+def normalize_count_params(query_params):
+    """
+    Reduce the request's query parameters to the ones that affect the count.
+
+    Empty values are dropped, search terms are lowercased with their
+    whitespace collapsed, and the parameters are kept in a fixed order, so
+    equivalent requests produce the same cache key. Exact filter values are
+    kept as they are.
+    """
+    normalized = []
+    for param in COUNT_FILTER_PARAMS:
+        value = query_params.get(param, '')
+        if param in WORD_PARAMS:
+            value = ' '.join(value.split()).lower()
+        if not value:
+            continue
+        normalized.append((param, value))
+    return normalized
+
+
+def get_table_versions(*models):
+    """
+    Return a (token, last_modified) pair for each of `models`' tables, in
+    one query.
+
+    The token changes on every write (see touch_tables) and last_modified
+    is the Unix timestamp of that write. Both come from the TableVersion
+    rows, so every worker process agrees on them; the time of the write is
+    part of the token so that a counter restarted from scratch (the rows
+    deleted, a restored backup) never repeats an old token.
+
+    Cached counts and ETags are built from the token, so a single write
+    invalidates all of them without having to know which entries exist.
+
+    A table without a row yet gets one, as if it had just been written,
+    which can only make clients refetch, never serve stale data.
+    """
+    from .models import TableVersion
+
+    labels = [model._meta.label_lower for model in models]
+    rows = {
+        table: (version, updated)
+        for table, version, updated in TableVersion.objects.filter(table__in=labels).values_list(
+            'table', 'version', 'updated'
+        )
+    }
+    missing = [model for model, label in zip(models, labels) if label not in rows]
+    if missing:
+        touch_tables(*missing)
+        return get_table_versions(*models)
+
+    versions = []
+    for label in labels:
+        version, updated = rows[label]
+        versions.append((f'{version}.{int(updated.timestamp() * 1000000)}', int(updated.timestamp())))
+    return versions
+
+
+def get_table_version(model):
+    """Return (token, last_modified) for `model`'s table, see get_table_versions()."""
+    return get_table_versions(model)[0]
+
+
+def touch_tables(*models):
+    """Record a write to the given models' tables."""
+    from .models import TableVersion
+
+    now = timezone.now()
+    for model in models:
+        label = model._meta.label_lower
+        bump = TableVersion.objects.filter(table=label)
+        if bump.update(version=F('version') + 1, updated=now):
+            continue
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=label, version=1, updated=now)
+        except IntegrityError:
+            # Another request created it first
+            bump.update(version=F('version') + 1, updated=now)
+
+
+def book_count_cache_key(normalized_params, table_versions=None):
+    """
+    Cache key of a book count. The key holds the Book and Author table
+    tokens, so a write made by any worker process moves every count to new
+    keys; entries under the old ones are never read again and expire.
+    Pass `table_versions` ({model: (token, last_modified)}) when the
+    request already read them.
+    """
+    from .models import Author, Book
+
+    # Counts depend on books and on author names (author__name filter/search)
+    table_versions = table_versions or {}
+    if Book in table_versions and Author in table_versions:
+        book_token, author_token = table_versions[Book][0], table_versions[Author][0]
+    else:
+        (book_token, _), (author_token, _) = get_table_versions(Book, Author)
+    digest = hashlib.md5(json.dumps(normalized_params).encode()).hexdigest()
+    return f'api:book_count:{book_token}:{author_token}:{digest}'
+
+
+def cached_count(queryset, query_params, table_versions=None):
+    """Return queryset.count(), cached per normalized filter combination."""
+    key = book_count_cache_key(normalize_count_params(query_params), table_versions)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, get_count_cache_timeout())
+    return count
+
+
+def approximate_count(model):
+    """
+    Return the estimated row count of `model`'s table from the database's
+    table statistics, or None when the backend has no estimate available.
+
+    - PostgreSQL: pg_class.reltuples (kept up to date by autovacuum/ANALYZE)
+    - MySQL: information_schema.TABLES.TABLE_ROWS (InnoDB estimate)
+    - SQLite: sqlite_stat1, only present after ANALYZE has been run
+    """
+    table = model._meta.db_table
+    vendor = connection.vendor
+
+    if vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+        params = [table]
+    elif vendor == 'mysql':
+        sql = (
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        )
+        params = [table]
+    elif vendor == 'sqlite':
+        # sqlite_stat1 only exists once ANALYZE has been run
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+        # Every row for the table (one per index) starts with the row count
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+        params = [table]
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None:
+        return None
+    if vendor == 'sqlite':
+        # The stat column looks like "<rows> <avg rows per key> ..."
+        return int(str(row[0]).split()[0])
+    estimate = int(row[0])
+    # PostgreSQL reports -1 for tables that were never analyzed
+    return estimate if estimate >= 0 else None
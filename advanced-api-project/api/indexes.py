@@ -0,0 +1,226 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from rest_framework.generics import GenericAPIView
+from rest_framework.test import APIRequestFactory
+
+
+def iter_api_views(patterns=None, prefix=''):
+    """
+    Yield (route, view_class) for every DRF generic view / viewset in the
+    URLconf that has a queryset.
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_api_views(pattern.url_patterns, prefix + str(pattern.pattern))
+            continue
+        view_class = getattr(pattern.callback, 'cls', None)
+        if view_class is None or not issubclass(view_class, GenericAPIView):
+            continue
+        if getattr(view_class, 'queryset', None) is None:
+            continue
+        yield prefix + str(pattern.pattern), view_class
+
+
+def resolve_field(model, path):
+    """
+    Follow a lookup path such as 'author__name'.
+
+    Returns (model, field) for the last field, or None if the path doesn't
+    resolve to a concrete column.
+    """
+    parts = path.split('__')
+    for i, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if i == len(parts) - 1:
+            if not field.concrete or field.many_to_many:
+                return None
+            return model, field
+        if not field.is_relation or field.related_model is None:
+            return None
+        model = field.related_model
+    return None
+
+
+def existing_indexes(model):
+    """Field-name tuples of the indexes the model already has."""
+    indexes = [(model._meta.pk.name,)]
+    for field in model._meta.concrete_fields:
+        if field.db_index or field.unique or field.is_relation:
+            indexes.append((field.name,))
+    for index in model._meta.indexes:
+        indexes.append(tuple(name.lstrip('-') for name in index.fields))
+    for fields in model._meta.unique_together:
+        indexes.append(tuple(fields))
+    return indexes
+
+
+def is_covered(fields, indexes):
+    """True when an index in `indexes` starts with `fields`."""
+    return any(index[:len(fields)] == fields for index in indexes)
+
+
+def _field_names(value):
+    if not value or value == '__all__':
+        return []
+    if isinstance(value, dict):
+        return list(value)
+    return [name for name in value if isinstance(name, str)]
+
+
+def propose_indexes(views):
+    """
+    Propose composite indexes from the filter, ordering and search fields
+    declared on `views` (an iterable of (route, view_class)).
+
+    Rules, for a view whose queryset model is M and whose default ordering
+    starts with local field D:
+
+    - equality filter on a local field F: (F, D, pk), so WHERE F = ? can
+      be served in the default order, including keyset pages
+    - ordering on a local field O: (O, pk), the keyset pagination order
+    - filter/ordering/search on a related field (author__name): an index on
+      the related model's column, (name, pk)
+    - search fields: only '^prefix' and '=exact' searches can use a b-tree
+      index; plain icontains searches go to the full-text index (search.py)
+
+    Proposals already covered by an existing index, or by a longer proposal
+    that starts with the same fields, are dropped.
+
+    Returns a dict {model: {fields tuple: [reasons]}}.
+    """
+    proposals = {}
+
+    def propose(model, fields, reason):
+        # Remove repeated columns while keeping the order
+        fields = tuple(dict.fromkeys(fields))
+        # A primary key lookup returns at most one row, nothing to sort
+        if fields[0] == model._meta.pk.name:
+            return
+        reasons = proposals.setdefault(model, {}).setdefault(fields, [])
+        if reason not in reasons:
+            reasons.append(reason)
+
+    for route, view in views:
+        model = view.queryset.model
+        pk = model._meta.pk.name
+        default_ordering = [name.lstrip('-') for name in _field_names(getattr(view, 'ordering', None))]
+        local_default = [name for name in default_ordering if '__' not in name][:1]
+
+        for name in _field_names(getattr(view, 'filterset_fields', None)):
+            resolved = resolve_field(model, name)
+            if resolved is None:
+                continue
+            target, field = resolved
+            if target is model:
+                propose(model, [field.name, *local_default, pk], f'{view.__name__} filterset_fields {name} ({route})')
+            else:
+                propose(target, [field.name, target._meta.pk.name], f'{view.__name__} filterset_fields {name} ({route})')
+
+        for name in _field_names(getattr(view, 'ordering_fields', None)) + default_ordering:
+            resolved = resolve_field(model, name)
+            if resolved is None:
+                continue
+            target, field = resolved
+            propose(target, [field.name, target._meta.pk.name], f'{view.__name__} ordering {name} ({route})')
+
+        for name in _field_names(getattr(view, 'search_fields', None)):
+            if not name.startswith(('^', '=')):
+                continue
+            resolved = resolve_field(model, name[1:])
+            if resolved is None:
+                continue
+            target, field = resolved
+            propose(target, [field.name], f'{view.__name__} search_fields {name} ({route})')
+
+    result = {}
+    for model, model_proposals in proposals.items():
+        indexes = existing_indexes(model)
+        candidates = sorted(model_proposals, key=len, reverse=True)
+        kept = {}
+        for fields in candidates:
+            if is_covered(fields, indexes) or is_covered(fields, list(kept)):
+                continue
+            kept[fields] = model_proposals[fields]
+        # Reasons of dropped proposals move to the index that covers them
+        for fields, reasons in model_proposals.items():
+            for kept_fields in kept:
+                if fields != kept_fields and kept_fields[:len(fields)] == fields:
+                    kept[kept_fields] = kept[kept_fields] + [r for r in reasons if r not in kept[kept_fields]]
+                    break
+        if kept:
+            result[model] = kept
+    return result
+
+
+def index_name(model, fields):
+    """Deterministic index name within Django's 30 character limit."""
+    name = '_'.join([model._meta.model_name[:8]] + [field[:7] for field in fields])
+    return f'{name[:26]}_idx'
+
+
+def record_view_queries(views, samples=10):
+    """
+    Run sample GET requests through the list views and record their SQL.
+
+    For each view without URL arguments, one request is made per declared
+    filter (using a value from the first row) and per ordering field, with
+    keyset pagination on. Returns a list of distinct (route, sql) pairs.
+    """
+    factory = APIRequestFactory(SERVER_NAME='localhost')
+    recorded = []
+    seen = set()
+
+    for route, view in views:
+        if '<' in route or not hasattr(view, 'list'):
+            continue
+        model = view.queryset.model
+        filters = _field_names(getattr(view, 'filterset_fields', None))
+        orderings = _field_names(getattr(view, 'ordering_fields', None))
+        sample = {}
+        if filters:
+            # First row's values for the filter fields (none on an empty table)
+            sample = model._default_manager.values(*filters).first() or {}
+
+        requests = [{}]
+        requests += [{name: sample[name]} for name in filters if sample.get(name) is not None]
+        requests += [{'ordering': name, 'page_size': 50} for name in orderings]
+
+        callback = view.as_view({'get': 'list'}) if hasattr(view, 'get_extra_actions') else view.as_view()
+        for params in requests[:samples]:
+            with CaptureQueriesContext(connection) as context:
+                response = callback(factory.get('/' + route, params))
+                if response.streaming:
+                    # Exports run their query while the body is consumed
+                    for _ in response.streaming_content:
+                        pass
+                else:
+                    response.render()
+            for query in context.captured_queries:
+                sql = query['sql']
+                if sql.lstrip().upper().startswith('SELECT') and sql not in seen:
+                    seen.add(sql)
+                    recorded.append((route, sql))
+    return recorded
+
+
+def explain(sql, params=None):
+    """Return the query plan lines for `sql` on the default database."""
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def uses_index(plan):
+    """Best-effort check that a plan reads through an index instead of a scan."""
+    text = ' '.join(plan).upper()
+    if connection.vendor == 'sqlite':
+        return 'USING INDEX' in text or 'USING COVERING INDEX' in text or 'USING INTEGER PRIMARY KEY' in text
+    return 'INDEX' in text and 'ALL' not in text.split()
@@ -0,0 +1,61 @@
+import timeit
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Author, Book
+from api.serializers import BookSerializer, FastReadSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare BookSerializer with FastReadSerializer for list responses. '
+        'Test books are created inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                            help='Number of books to serialize (default: 1000 10000 100000)')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the fastest run is reported')
+
+    def handle(self, *args, **options):
+        fast_serializer = FastReadSerializer.for_serializer(BookSerializer)
+        repeat = options['repeat']
+
+        with transaction.atomic():
+            author = Author.objects.create(name='Benchmark Author')
+            created = 0
+
+            for size in sorted(options['sizes']):
+                Book.objects.bulk_create(
+                    [
+                        Book(title=f'Benchmark Book {i:07d}', author=author, publication_year=date(2000, 1, 1))
+                        for i in range(created, size)
+                    ],
+                    batch_size=5000,
+                )
+                created = max(created, size)
+                queryset = Book.objects.filter(author=author).order_by('title', 'id')
+
+                regular_data = BookSerializer(queryset.all(), many=True).data
+                fast_data = fast_serializer.serialize(queryset.all())
+                if [dict(row) for row in regular_data] != fast_data:
+                    raise CommandError(f'FastReadSerializer output differs from BookSerializer at {size} rows')
+
+                regular = min(timeit.repeat(
+                    lambda: BookSerializer(queryset.all(), many=True).data, number=1, repeat=repeat
+                ))
+                fast = min(timeit.repeat(
+                    lambda: fast_serializer.serialize(queryset.all()), number=1, repeat=repeat
+                ))
+
+                self.stdout.write(
+                    f'{size:>8} rows  '
+                    f'BookSerializer {regular * 1000:9.1f} ms  '
+                    f'FastReadSerializer {fast * 1000:9.1f} ms  '
+                    f'speedup {regular / fast:5.1f}x'
+                )
+
+            transaction.set_rollback(True)
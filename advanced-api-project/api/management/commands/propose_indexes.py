@@ -0,0 +1,107 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import migrations, models, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from api.indexes import (
+    explain, index_name, iter_api_views, propose_indexes, record_view_queries, uses_index,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Propose composite indexes from the filterset_fields, ordering_fields and '
+        'search_fields of the registered API views, optionally write them as a '
+        'migration, and report index usage from EXPLAIN on sample view queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--write', action='store_true',
+                            help='Write the proposed indexes as a new migration per app')
+        parser.add_argument('--explain', action='store_true',
+                            help='Run sample requests through the list views and EXPLAIN their queries')
+        parser.add_argument('--sql-file',
+                            help='EXPLAIN the recorded SQL statements in this file (one per line) instead')
+        parser.add_argument('--samples', type=int, default=10,
+                            help='Maximum sample requests per view for --explain (default: 10)')
+
+    def handle(self, *args, **options):
+        views = list(iter_api_views())
+        proposals = propose_indexes(views)
+
+        if not proposals:
+            self.stdout.write('The declared filters and orderings are covered by existing indexes.')
+        for model, indexes in proposals.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{model._meta.label}:'))
+            for fields, reasons in indexes.items():
+                self.stdout.write(
+                    f"    models.Index(fields={list(fields)!r}, name={index_name(model, fields)!r}),"
+                )
+                for reason in reasons:
+                    self.stdout.write(f'        # {reason}')
+
+        if options['write'] and proposals:
+            for app_label, operations in self.get_operations(proposals).items():
+                path = self.write_migration(app_label, operations)
+                self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+            self.stdout.write('Add the indexes above to the models\' Meta.indexes to keep them in sync.')
+
+        if options['sql_file']:
+            with open(options['sql_file']) as sql_file:
+                recorded = [('-', line.strip()) for line in sql_file if line.strip()]
+            self.report_plans(recorded)
+        elif options['explain']:
+            # Sample requests may touch caches or indexes; never keep any write
+            with transaction.atomic():
+                recorded = record_view_queries(views, samples=options['samples'])
+                self.report_plans(recorded)
+                transaction.set_rollback(True)
+
+    def get_operations(self, proposals):
+        operations = {}
+        for model, indexes in proposals.items():
+            for fields in indexes:
+                operations.setdefault(model._meta.app_label, []).append(migrations.AddIndex(
+                    model_name=model._meta.model_name,
+                    index=models.Index(fields=list(fields), name=index_name(model, fields)),
+                ))
+        return operations
+
+    def write_migration(self, app_label, operations):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaves = loader.graph.leaf_nodes(app_label)
+        if len(leaves) > 1:
+            raise CommandError(f'{app_label} has conflicting migrations; run makemigrations --merge first.')
+
+        number = 1
+        if leaves:
+            number = int(leaves[0][1].split('_')[0]) + 1
+        migration = migrations.Migration(f'{number:04d}_api_view_indexes', app_label)
+        migration.dependencies = leaves
+        migration.operations = operations
+
+        writer = MigrationWriter(migration)
+        if os.path.exists(writer.path):
+            raise CommandError(f'{writer.path} already exists.')
+        os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+        with open(writer.path, 'w') as migration_file:
+            migration_file.write(writer.as_string())
+        return writer.path
+
+    def report_plans(self, recorded):
+        indexed = 0
+        for route, sql in recorded:
+            try:
+                plan = explain(sql)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'[{route}] could not EXPLAIN: {e}'))
+                continue
+            used = uses_index(plan)
+            indexed += used
+            style = self.style.SUCCESS if used else self.style.WARNING
+            self.stdout.write(style(f"[{route}] {'index' if used else 'scan'}: {sql}"))
+            for line in plan:
+                self.stdout.write(f'    {line}')
+        self.stdout.write(f'{indexed} of {len(recorded)} queries read through an index.')
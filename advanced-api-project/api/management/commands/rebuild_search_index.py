@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over book titles and author names from scratch.'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError('No search backend is available for this database.')
+
+        backend.create_index()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {backend.table} ({backend.__class__.__name__}).'))
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from api.search import get_search_backend
+    backend = get_search_backend()
+    if backend is not None:
+        backend.create_index()
+
+
+def drop_search_index(apps, schema_editor):
+    from api.search import get_search_backend
+    backend = get_search_backend()
+    if backend is not None:
+        backend.drop_index()
+
+
+class Migration(migrations.Migration):
+    """
+    Create the full-text search index used by FullTextSearchFilter
+    (SQLite FTS5 or MySQL FULLTEXT, see api/search.py) and fill it from the
+    existing books. Other databases have no index and keep using LIKE.
+    """
+
+    dependencies = [
+        ('api', '0002_book_author_related_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
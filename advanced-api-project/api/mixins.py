@@ -0,0 +1,224 @@
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers
+
+from advanced_api_project.middleware import QueryBudgetExceeded
+
+from .cache import get_table_versions
+from .renderers import NDJSONRenderer, CSVRenderer
+
+logger = logging.getLogger(__name__)
+
+
+def get_query_plan(serializer_class, prefix=''):
+    """
+    Collect the relations a serializer (and its nested serializers) traverse.
+
+    Serializers declare them in their Meta:
+
+        class Meta:
+            model = Book
+            select_related = ['author']       # forward FK / one-to-one
+            prefetch_related = ['tags']       # reverse FK / many-to-many
+
+    Nested serializers are followed through their `source`, so a nested
+    serializer's own relations are prefetched through the parent relation
+    (e.g. AuthorSerializer.books + BookSerializer's 'author' becomes
+    'books__author').
+
+    Returns a (select_related, prefetch_related) tuple of lists.
+    """
+    meta = getattr(serializer_class, 'Meta', None)
+    select_related = [prefix + name for name in getattr(meta, 'select_related', [])]
+    prefetch_related = [prefix + name for name in getattr(meta, 'prefetch_related', [])]
+
+    for field_name, field in serializer_class().fields.items():
+        nested = getattr(field, 'child', field)
+        if not isinstance(nested, serializers.BaseSerializer):
+            continue
+        source = field.source or field_name
+        if source == '*':
+            continue
+        relation = prefix + source.replace('.', '__')
+        nested_select, nested_prefetch = get_query_plan(type(nested), relation + '__')
+
+        if isinstance(field, serializers.ListSerializer):
+            # Everything below a to-many relation has to be prefetched
+            if relation not in prefetch_related:
+                prefetch_related.append(relation)
+            prefetch_related.extend(nested_select + nested_prefetch)
+        else:
+            if relation not in select_related:
+                select_related.append(relation)
+            select_related.extend(nested_select)
+            prefetch_related.extend(nested_prefetch)
+
+    return select_related, prefetch_related
+
+
+class QueryCounter:
+    """connection.execute_wrapper() hook that counts executed queries."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryPlanMixin:
+    """
+    View mixin that applies the serializer's query plan to the queryset.
+
+    - get_queryset() adds the select_related/prefetch_related declared by the
+      serializer (see get_query_plan), so nested serializers don't run one
+      query per row.
+    - query_budget (optional): maximum number of queries a request may run.
+      When exceeded, QueryBudgetExceeded is raised if the
+      QUERY_BUDGET_STRICT setting is on (enable it in tests), otherwise
+      a warning is logged. When QueryInstrumentationMiddleware is active it
+      enforces the budget over the whole request instead.
+    """
+    query_budget = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        select_related, prefetch_related = get_query_plan(self.get_serializer_class())
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None or hasattr(request, 'query_stats'):
+            return super().dispatch(request, *args, **kwargs)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+        self.check_query_budget(request, counter.count)
+        return response
+
+    def check_query_budget(self, request, query_count):
+        if query_count <= self.query_budget:
+            return
+        message = (
+            f'{self.__class__.__name__} ran {query_count} queries for '
+            f'{request.method} {request.path} (budget: {self.query_budget})'
+        )
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class StreamingExportMixin:
+    """
+    List view mixin that streams the filtered queryset as NDJSON or CSV.
+
+    Rows are read with values_list().iterator(chunk_size=...) and written to
+    a StreamingHttpResponse as they arrive, so memory stays flat however
+    many rows are exported. The format is picked with ?format=ndjson (the
+    default) or ?format=csv, or through the Accept header.
+
+    - export_fields: values() lookups in column order; the column name is
+      the lookup with '__' replaced by '_' (author__name -> author_name)
+    - export_filename: download name, without the extension
+    """
+    export_fields = []
+    export_filename = 'export'
+    export_chunk_size = 2000
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    pagination_class = None
+
+    def get_export_columns(self):
+        return [field.replace('__', '_') for field in self.export_fields]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*self.export_fields).iterator(chunk_size=self.export_chunk_size)
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(self.get_export_columns(), rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename}.{renderer.format}"'
+        return response
+
+
+class NotModified(Exception):
+    """Carries the 304 response out of APIView.initial()."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    View mixin adding ETag / Last-Modified support to GET and HEAD requests.
+
+    The validators come from the per-table versions in cache.py (bumped on
+    every write to conditional_models), read with a single primary key
+    query. When the client's If-None-Match or If-Modified-Since still
+    matches, a 304 is returned straight after the permission checks,
+    without running the queryset or the serializer.
+
+    - conditional_models: models whose changes alter the response
+      (default: the view's queryset model)
+
+    The ETag also covers the full path (query string) and the Accept header,
+    so different filters, pages and formats each get their own tag.
+    """
+    conditional_models = None
+
+    def get_conditional_models(self):
+        return self.conditional_models or [self.queryset.model]
+
+    def get_conditional_headers(self, request):
+        """Return (etag, last_modified timestamp) for the current request."""
+        models = self.get_conditional_models()
+        versions = get_table_versions(*models)
+        # Kept for other per-table caches of the request (book counts)
+        self.table_versions = dict(zip(models, versions))
+        tokens = ':'.join(token for token, _ in versions)
+        last_modified = max(timestamp for _, timestamp in versions)
+
+        raw = '|'.join([tokens, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')])
+        etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permissions run first, so a 304 is never
+        # returned to a client that may not see the resource
+        super().initial(request, *args, **kwargs)
+
+        self.conditional_headers = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        etag, last_modified = self.conditional_headers = self.get_conditional_headers(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        headers = getattr(self, 'conditional_headers', None)
+        if headers and response.status_code in (200, 304):
+            etag, last_modified = headers
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
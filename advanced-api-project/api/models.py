@@ -1,16 +1,86 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 # Create your models here.
 class Author(models.Model):
     name = models.CharField(max_length=100)
 
+    class Meta:
+        # Proposed by `manage.py propose_indexes` from the API views'
+        # filter/ordering fields; keep in sync with the migrations
+        indexes = [
+            models.Index(fields=['name', 'id'], name='author_name_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
     
 class Book(models.Model):
     title = models.CharField(max_length=200)
-    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
     publication_year = models.DateField()
 
+    class Meta:
+        # Proposed by `manage.py propose_indexes`, see Author.Meta
+        indexes = [
+            models.Index(fields=['publication_year', 'title', 'id'], name='book_publica_title_id_idx'),
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+            models.Index(fields=['publication_year', 'id'], name='book_publica_id_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class TableVersion(models.Model):
+    """
+    Write counter of a table, the validator behind cached book counts and
+    ETags (see cache.py).
+
+    Kept in the database rather than the cache so that every worker process
+    sees the same version.
+    """
+    table = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField()
+
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.table} v{self.version}'
+
+
+# Cached book counts and ETags (see cache.py) are built from a per-table
+# version (TableVersion), so every write to a table bumps its version.
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def touch_table_version(sender, **kwargs):
+    from .cache import touch_tables
+    touch_tables(sender)
+
+
+# Keep the full-text search index (see search.py) in sync with books and
+# author names
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, created, **kwargs):
+    from .search import get_search_backend
+    backend = get_search_backend()
+    if backend is not None:
+        backend.index_books([instance], created=created)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    from .search import get_search_backend
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove_books([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created, **kwargs):
+    from .search import get_search_backend
+    backend = get_search_backend()
+    if backend is not None and not created:
+        backend.reindex_author(instance)
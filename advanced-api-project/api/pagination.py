@@ -0,0 +1,235 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination that follows the view's ordering fields.
+
+    Instead of OFFSET, every page is fetched with a WHERE clause that starts
+    right after the last row of the previous page, e.g. for ordering
+    ['title', 'id']:
+
+        WHERE title > 'Emma' OR (title = 'Emma' AND id > 3)
+
+    so page N costs the same as page 1. The primary key is always appended to
+    the ordering as a tie-breaker, which keeps the position stable even when
+    several rows share the same title, year or author.
+
+    - Opt-in: only active when the request carries ?cursor= or ?page_size=
+    - Cursors are opaque (base64 encoded JSON) and only valid for the same
+      ordering they were created with
+    - COUNT(*) is skipped unless the client asks for it with ?count=true
+      (or ?count=approximate, see BookListView.get_count)
+
+    Ordering fields must be non-nullable columns.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    count_values = ('1', 'true', 'yes', 'approximate')
+    tie_breaker = 'pk'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def is_enabled(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_enabled(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.count = None
+
+        if request.query_params.get(self.count_query_param, '').lower() in self.count_values:
+            # Only count when the client explicitly asked for it. Views can
+            # provide get_count() to serve the number from a cache.
+            get_count = getattr(view, 'get_count', None)
+            self.count = get_count(queryset) if get_count else queryset.count()
+
+        position, reverse = self.decode_cursor(request, queryset)
+
+        # Walking backwards means flipping every ordering direction, fetching
+        # the rows just before the cursor, then putting them back in order.
+        query_ordering = [self._flip(field) for field in self.ordering] if reverse else self.ordering
+
+        keys = {self._key_name(i): F(self._field_name(field)) for i, field in enumerate(self.ordering)}
+        queryset = queryset.annotate(**keys).order_by(*query_ordering)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(query_ordering, position))
+
+        # Fetch one extra row to find out whether there is another page
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response_data = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['results'] = data
+        return Response(response_data)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        """
+        Return the ordering used for the keyset, ending with the tie-breaker.
+
+        The ordering applied by OrderingFilter wins, then the view's `ordering`
+        attribute, then the model's Meta.ordering.
+        """
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(getattr(view, 'ordering', None) or queryset.model._meta.ordering or [])
+
+        pk_names = {self.tie_breaker, 'id', queryset.model._meta.pk.name}
+        if not any(self._field_name(field) in pk_names for field in ordering):
+            ordering.append(self.tie_breaker)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        position = [self._to_json(getattr(instance, self._key_name(i))) for i in range(len(self.ordering))]
+        payload = {'o': self.ordering, 'p': position}
+        if reverse:
+            payload['r'] = 1
+        cursor = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, queryset):
+        """
+        Return (position, reverse) for the current request.
+
+        The first page has no cursor and starts at position None. The values
+        are converted with the ordering fields' to_python() (model fields or
+        the queryset's annotations), so a cursor whose values don't fit the
+        fields is invalid rather than an error in the query.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position = payload['p']
+            ordering = payload['o']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor from a different ?ordering= would point at the wrong rows
+        if ordering != self.ordering or not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Ordering fields are non-nullable, and a list or object is never a
+        # column value
+        if any(value is None or isinstance(value, (list, dict)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                self._resolve_field(queryset, self._field_name(field)).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def _resolve_field(queryset, name):
+        """
+        The field `name` refers to: an annotation's output field, or a model
+        field, following relations (author__name).
+        """
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        model = queryset.model
+        *path, last = name.split('__')
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        field = model._meta.pk if last == 'pk' else model._meta.get_field(last)
+        # Ordering by a foreign key orders by the key it points to
+        return field.target_field if field.many_to_one else field
+
+    def _keyset_filter(self, ordering, position):
+        """
+        Build the "row comes after position" condition for `ordering`:
+
+            f1 > v1 OR (f1 = v1 AND f2 > v2) OR (f1 = v1 AND f2 = v2 AND f3 > v3)
+        """
+        condition = Q()
+        for i, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{self._key_name(i)}__{lookup}': position[i]})
+            for j in range(i):
+                clause &= Q(**{self._key_name(j): position[j]})
+            condition |= clause
+        return condition
+
+    @staticmethod
+    def _key_name(index):
+        return f'keyset_{index}'
+
+    @staticmethod
+    def _field_name(field):
+        return field.lstrip('-')
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _to_json(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+class BookKeysetPagination(KeysetPagination):
+    """Keyset pagination for BookListView (title, publication_year, author__name)."""
+    page_size = 50
+    max_page_size = 500
@@ -0,0 +1,45 @@
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class InvalidLine:
+    """
+    Placeholder yielded by NDJSONParser for a line that isn't valid JSON or
+    isn't in the request's encoding.
+    """
+
+    def __init__(self, error):
+        self.error = error
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON (one JSON object per line).
+
+    The request body is read line by line and the items are yielded lazily,
+    so a view can validate and write them in chunks without holding the
+    whole upload in memory. Blank lines are skipped; a line that isn't valid
+    JSON, or can't be decoded, yields an InvalidLine so it can be reported
+    as a per-item error instead of failing the whole stream.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self._iter_items(stream, encoding)
+
+    def _iter_items(self, stream, encoding):
+        if stream is None:
+            return
+        for line in stream:
+            try:
+                line = line.decode(encoding).strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+            except (UnicodeDecodeError, ValueError) as exc:
+                item = InvalidLine(str(exc))
+            yield item
@@ -0,0 +1,58 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Base class for the export renderers.
+
+    stream() turns an iterable of rows into an iterable of encoded lines, so
+    a StreamingHttpResponse can send them as they are fetched. render() is
+    only used for regular Response objects (e.g. error messages).
+    """
+    charset = 'utf-8'
+
+    def stream(self, columns, rows):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = [data]
+        columns = list(data[0].keys()) if data else []
+        rows = ([item.get(column) for column in columns] for item in data)
+        return b''.join(self.stream(columns, rows))
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """One JSON object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def stream(self, columns, rows):
+        for row in rows:
+            line = json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder)
+            yield (line + '\n').encode(self.charset)
+
+
+class CSVRenderer(StreamingRenderer):
+    """Comma-separated values with a header row."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, columns, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns).encode(self.charset)
+        for row in rows:
+            yield writer.writerow(row).encode(self.charset)
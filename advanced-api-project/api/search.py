@@ -0,0 +1,229 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+
+class BaseSearchBackend(ABC):
+    """
+    Inverted index over Book.title and Author.name.
+
+    The index lives in its own table keyed by the book id and is kept up to
+    date incrementally by the receivers in models.py (and by BookBulkView for
+    bulk writes, which don't send signals). Backends implement:
+
+    - create_index(): create the index table and fill it from api_book
+    - drop_index(): drop the index table
+    - search(queryset, terms, rank_annotation): join the index rows matching
+      `terms` to `queryset` once and annotate their rank (lower is more
+      relevant) as `rank_annotation`
+
+    and share:
+
+    - index_books(books): insert or replace the entries of the given books
+    - remove_books(book_ids): drop entries
+    - reindex_author(author): refresh author_name for the author's books
+    """
+    vendor = None
+    table = 'api_book_search'
+    id_column = 'book_id'
+
+    def execute(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    @abstractmethod
+    def create_index(self):
+        pass
+
+    @abstractmethod
+    def drop_index(self):
+        pass
+
+    @abstractmethod
+    def search(self, queryset, terms, rank_annotation):
+        pass
+
+    def index_books(self, books, created=False):
+        """
+        Index `books` (with their author loaded). Pass created=True for new
+        books to skip removing their old entries.
+        """
+        books = list(books)
+        if not books:
+            return
+        if not created:
+            self.remove_books([book.pk for book in books])
+        rows = [(book.pk, book.title, book.author.name) for book in books]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} ({self.id_column}, title, author_name) VALUES (%s, %s, %s)', rows
+            )
+
+    def remove_books(self, book_ids):
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        self.execute(f'DELETE FROM {self.table} WHERE {self.id_column} IN ({placeholders})', book_ids)
+
+    def reindex_author(self, author):
+        self.execute(
+            f'UPDATE {self.table} SET author_name = %s '
+            f'WHERE {self.id_column} IN (SELECT id FROM api_book WHERE author_id = %s)',
+            [author.name, author.pk],
+        )
+
+    def populate_sql(self):
+        return (
+            f'INSERT INTO {self.table} ({self.id_column}, title, author_name) '
+            'SELECT api_book.id, api_book.title, api_author.name '
+            'FROM api_book INNER JOIN api_author ON api_author.id = api_book.author_id'
+        )
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    SQLite FTS5 virtual table. The FTS rowid is the book id.
+
+    Terms are matched as word prefixes ("orw" finds "Orwell") and all of
+    them must match, in either column. Ranking uses FTS5's bm25().
+    """
+    vendor = 'sqlite'
+    table = 'api_book_fts'
+    id_column = 'rowid'
+
+    def create_index(self):
+        self.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+            f"USING fts5(title, author_name, tokenize='unicode61')"
+        )
+        self.execute(f'DELETE FROM {self.table}')
+        self.execute(self.populate_sql())
+
+    def drop_index(self):
+        self.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def build_query(self, terms):
+        # Quote every term so user input can't use FTS5 query syntax
+        return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+    def search(self, queryset, terms, rank_annotation):
+        # The MATCH drives the join: FTS5 yields the matching rowids with
+        # their rank once, and each is looked up in api_book by primary key.
+        queryset = queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.rowid = {queryset.model._meta.db_table}.id',
+                f'{self.table} MATCH %s',
+            ],
+            params=[self.build_query(terms)],
+        )
+        return queryset.annotate(
+            **{rank_annotation: RawSQL(f'{self.table}.rank', [], output_field=FloatField())}
+        )
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """
+    MySQL/MariaDB side table with a FULLTEXT index on (title, author_name).
+
+    Uses boolean mode with a required prefix match per term (+orw*). The
+    relevance score is negated so that, like FTS5, lower ranks come first.
+    """
+    vendor = 'mysql'
+    table = 'api_book_search'
+    id_column = 'book_id'
+
+    def create_index(self):
+        self.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'book_id BIGINT NOT NULL PRIMARY KEY, '
+            'title VARCHAR(200) NOT NULL, '
+            'author_name VARCHAR(100) NOT NULL, '
+            'FULLTEXT KEY api_book_search_fulltext (title, author_name)'
+            ') ENGINE=InnoDB'
+        )
+        self.execute(f'DELETE FROM {self.table}')
+        self.execute(self.populate_sql())
+
+    def drop_index(self):
+        self.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def build_query(self, terms):
+        # Strip boolean-mode operators so user input is only ever words
+        words = [re.sub(r'[+\-<>()~*"@]', '', term) for term in terms]
+        return ' '.join(f'+{word}*' for word in words if word)
+
+    def search(self, queryset, terms, rank_annotation):
+        # The FULLTEXT index scan in the WHERE clause drives the join. MySQL
+        # evaluates a MATCH() once per query, so repeating the identical
+        # expression as the rank reuses the scores of that scan.
+        match = (
+            f'MATCH({self.table}.title, {self.table}.author_name) '
+            'AGAINST (%s IN BOOLEAN MODE)'
+        )
+        query = self.build_query(terms)
+        queryset = queryset.extra(
+            tables=[self.table],
+            where=[f'{self.table}.book_id = {queryset.model._meta.db_table}.id', match],
+            params=[query],
+        )
+        return queryset.annotate(
+            **{rank_annotation: RawSQL(f'-{match}', [query], output_field=FloatField())}
+        )
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteFTS5Backend,
+    'mysql': MySQLFullTextBackend,
+}
+
+
+def get_search_backend():
+    """
+    Return the search backend for the default database, or None.
+
+    The API_SEARCH_BACKEND setting can name a backend class explicitly;
+    otherwise it is picked from the database vendor. None means there is no
+    index for this database and searching falls back to SearchFilter.
+    """
+    path = getattr(settings, 'API_SEARCH_BACKEND', None)
+    if path:
+        backend_class = import_string(path)
+    else:
+        backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    if backend_class is None or backend_class.vendor != connection.vendor:
+        return None
+    return backend_class()
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for rest_framework.filters.SearchFilter that uses the
+    full-text index instead of icontains LIKE '%term%' scans over a JOIN.
+
+    Put it after OrderingFilter in filter_backends: matches are annotated
+    with `search_rank` and, unless the client passed ?ordering=, ordered by
+    relevance (most relevant first, id as tie-breaker). When the database
+    has no search backend, the regular SearchFilter behaviour is used.
+    """
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        terms = self.get_search_terms(request)
+        if backend is None or not terms:
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = backend.search(queryset, terms, self.rank_annotation)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by(self.rank_annotation, 'pk')
+        return queryset
+
@@ -1,14 +1,19 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Author, Book
 from datetime import datetime
 
+# Relations a serializer traverses are declared in its Meta
+# (select_related / prefetch_related) and applied by views using
+# mixins.QueryPlanMixin. Nested serializers such as AuthorSerializer.books
+# are picked up automatically.
 class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
-        field = '__all__'
+        fields = '__all__'
 
     def validate_publication_year(self, value):
-        if value > datetime.now().year:
+        if value > datetime.now().date():
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
     
@@ -17,4 +22,125 @@ class AuthorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = ['id', 'name', 'books']
+        prefetch_related = ['books']
 
+
+
+
+class BulkAuthorField(serializers.PrimaryKeyRelatedField):
+    """
+    Author primary key field that resolves against authors preloaded into
+    the serializer context (context['authors'], an in_bulk() dict) instead
+    of running one query per item.
+    """
+
+    def to_internal_value(self, data):
+        authors = self.context.get('authors')
+        if authors is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return authors[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BookBulkSerializer(BookSerializer):
+    """BookSerializer used by BookBulkView to validate one item at a time."""
+    author = BulkAuthorField(queryset=Author.objects.all())
+
+    class Meta(BookSerializer.Meta):
+        pass
+
+
+
+class FastReadSerializer:
+    """
+    Read-only fast path that produces the same output as a ModelSerializer.
+
+    The field list and one converter per field are worked out once from the
+    serializer class, then rows are built straight from values_list() tuples
+    (or from model attributes) without going through per-instance
+    to_representation() and field lookups:
+
+        - char/integer/boolean fields: value as-is
+        - date fields (ISO format): value.isoformat()
+        - primary key related fields: the foreign key id
+        - anything else: the field's own to_representation()
+
+    Nested serializers and method fields can't be built from a flat row;
+    is_supported() returns False for those serializers.
+
+        FastReadSerializer(BookSerializer).serialize(queryset)
+    """
+    IDENTITY_FIELDS = (
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+    )
+
+    _cache = {}
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        """Return the (cached) fast serializer for `serializer_class`."""
+        if serializer_class not in cls._cache:
+            cls._cache[serializer_class] = cls(serializer_class)
+        return cls._cache[serializer_class]
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.columns = []
+        self.lookups = []
+        self.attnames = []
+        self.converters = []
+        self.supported = True
+
+        model = serializer_class.Meta.model
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)) or '.' in field.source:
+                self.supported = False
+                continue
+
+            model_field = model._meta.get_field(field.source)
+            self.columns.append(name)
+            self.lookups.append(field.source)
+            self.attnames.append(model_field.attname)
+            self.converters.append(self.get_converter(field))
+
+    def get_converter(self, field):
+        """Return a function for the field's value, or None to keep it as-is."""
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            return None
+        if isinstance(field, self.IDENTITY_FIELDS):
+            return None
+        if isinstance(field, serializers.DateField) and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+            return lambda value: value.isoformat()
+        return field.to_representation
+
+    def is_supported(self):
+        return self.supported
+
+    def build_row(self, values):
+        row = {}
+        for column, converter, value in zip(self.columns, self.converters, values):
+            if converter is not None and value is not None:
+                value = converter(value)
+            row[column] = value
+        return row
+
+    def serialize(self, queryset):
+        """Serialize a queryset in one values_list() query."""
+        build_row = self.build_row
+        return [build_row(values) for values in queryset.values_list(*self.lookups)]
+
+    def serialize_objects(self, instances):
+        """Serialize already loaded model instances (e.g. a page)."""
+        build_row = self.build_row
+        attnames = self.attnames
+        return [build_row([getattr(instance, attname) for attname in attnames]) for instance in instances]
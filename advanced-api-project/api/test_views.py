@@ -1,9 +1,21 @@
+import base64
+import csv
+import json
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from datetime import date, timedelta
-from ..models import Author, Book
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import override_settings
+from .models import Author, Book, TableVersion
+from .mixins import QueryBudgetExceeded, get_query_plan
+from .serializers import AuthorSerializer, BookSerializer, FastReadSerializer
+from .views import AuthorListView, BookListView
+from .search import get_search_backend
 
 User = get_user_model()
 
@@ -111,7 +123,7 @@ class BookAPITestCase(APITestCase):
         }
         response = self.client.post(self.create_url, new_book_data, format='json')
         
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual(Book.objects.count(), 3) # Count should remain the same
         
     def test_create_book_future_year_fails(self):
@@ -169,7 +181,7 @@ class BookAPITestCase(APITestCase):
         }
         response = self.client.patch(self.update_url, update_data, format='json')
         
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         
         # Verify database unchanged
         self.book1.refresh_from_db()
@@ -198,5 +210,543 @@ class BookAPITestCase(APITestCase):
         
         response = self.client.delete(self.delete_url)
         
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
-        self.assertEqual(Book.objects.count(), book_count_before) # Count should remain the same
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Book.objects.count(), book_count_before) # Count should remain the same
+
+class BookKeysetPaginationTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author1 = Author.objects.create(name='Jane Austen')
+        cls.author2 = Author.objects.create(name='George Orwell')
+        # Duplicate titles make sure the id tie-breaker keeps pages stable
+        for i in range(7):
+            create_book(f"Book {i % 3}", cls.author1 if i % 2 else cls.author2, date(1900 + i, 1, 1))
+        cls.list_url = reverse('api:book-list')
+
+    def walk(self, params):
+        """Follow `next` links from the first page and collect every title/id."""
+        seen = []
+        response = self.client.get(self.list_url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend((book['title'], book['id']) for book in response.data['results'])
+            if response.data['next'] is None:
+                return seen, response
+            response = self.client.get(response.data['next'])
+
+    def test_pages_follow_ordering_without_gaps_or_duplicates(self):
+        """Walking every page returns each book once, in title/id order."""
+        seen, _ = self.walk({'page_size': 2})
+
+        expected = list(Book.objects.order_by('title', 'id').values_list('title', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_pages_follow_custom_ordering(self):
+        """Keyset pages honour ?ordering= across related and descending fields."""
+        seen, _ = self.walk({'page_size': 3, 'ordering': '-author__name'})
+
+        expected = list(Book.objects.order_by('-author__name', 'id').values_list('title', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get(self.list_url, {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(first.data['previous'])
+
+    def test_count_is_skipped_unless_requested(self):
+        response = self.client.get(self.list_url, {'page_size': 3})
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(self.list_url, {'page_size': 3, 'count': 'true'})
+        self.assertEqual(response.data['count'], 7)
+
+    def test_deep_page_uses_constant_queries(self):
+        """Later pages run a single keyset query, no OFFSET and no COUNT."""
+        first = self.client.get(self.list_url, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        # The table versions (ETag), then the page
+        with self.assertNumQueries(2):
+            self.client.get(second.data['next'])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.list_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        first = self.client.get(self.list_url, {'page_size': 2})
+        response = self.client.get(first.data['next'] + '&ordering=publication_year')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_must_fit_the_ordering_fields(self):
+        cursors = [
+            ('title', ['x', 'y']),
+            ('title', [None, 1]),
+            ('title', [['Book 1'], 1]),
+            ('publication_year', ['not a date', 1]),
+            ('author__name', [{'name': 'Orwell'}, 1]),
+        ]
+        for ordering, position in cursors:
+            payload = {'o': [ordering, 'pk'], 'p': position}
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get(self.list_url, {'cursor': cursor, 'ordering': ordering})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, payload)
+
+    def test_cursor_on_related_field(self):
+        seen, _ = self.walk({'page_size': 2, 'ordering': 'author__name'})
+        self.assertEqual(len(seen), 7)
+
+
+
+class BookCountCacheTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='George Orwell')
+        for i in range(3):
+            create_book(f"Book {i}", cls.author, date(1940 + i, 1, 1))
+        cls.list_url = reverse('api:book-list')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_per_filter_combination(self):
+        """The second identical request skips the COUNT(*) query."""
+        params = {'page_size': 2, 'count': 'true', 'search': 'orwell'}
+        self.client.get(self.list_url, params)
+
+        # The table versions (ETag and count key) and the page
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url, {**params, 'search': '  ORWELL '})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_exact_filters_keep_their_whitespace(self):
+        create_book("Two  Spaces", self.author, date(1950, 1, 1))
+        params = {'page_size': 2, 'count': 'true'}
+        self.assertEqual(self.client.get(self.list_url, {**params, 'title': 'Two  Spaces'}).data['count'], 1)
+        self.assertEqual(self.client.get(self.list_url, {**params, 'title': 'Two Spaces'}).data['count'], 0)
+
+    def test_book_save_and_delete_invalidate_count(self):
+        params = {'page_size': 2, 'count': 'true'}
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 3)
+
+        book = create_book("Book 3", self.author, date(1950, 1, 1))
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 4)
+
+        book.delete()
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 3)
+
+    def test_author_rename_invalidates_count(self):
+        params = {'page_size': 2, 'count': 'true', 'author__name': 'Eric Blair'}
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 0)
+
+        self.author.name = 'Eric Blair'
+        self.author.save()
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 3)
+
+    def test_write_from_another_process_invalidates_count(self):
+        params = {'page_size': 2, 'count': 'true'}
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 3)
+
+        # A worker with its own cache: only the table version is shared
+        Book.objects.bulk_create([Book(title='Book 3', author=self.author, publication_year=date(1950, 1, 1))])
+        TableVersion.objects.filter(table='api.book').update(version=F('version') + 1)
+        self.assertEqual(self.client.get(self.list_url, params).data['count'], 4)
+
+    def test_approximate_count_uses_table_statistics(self):
+        """?count=approximate reads sqlite_stat1 once ANALYZE has run."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        response = self.client.get(self.list_url, {'page_size': 2, 'count': 'approximate'})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_approximate_count_is_exact_when_filtered(self):
+        response = self.client.get(self.list_url, {'page_size': 2, 'count': 'approximate', 'title': 'Book 1'})
+        self.assertEqual(response.data['count'], 1)
+
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class AuthorListQueryPlanTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.list_url = reverse('api:author-list')
+
+    def create_authors(self, count):
+        for i in range(count):
+            author = Author.objects.create(name=f'Author {i}')
+            create_book(f"Book {i}", author, date(1950, 1, 1))
+            create_book(f"Book {i} (2nd edition)", author, date(1960, 1, 1))
+
+    def test_author_serializer_query_plan(self):
+        self.assertEqual(get_query_plan(AuthorSerializer), ([], ['books']))
+
+    def test_author_list_runs_constant_queries(self):
+        """Listing authors costs the same number of queries for 3 or 30 authors."""
+        self.create_authors(3)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data[0]['books']), 2)
+
+        self.create_authors(30)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data), 33)
+
+    def test_exceeding_query_budget_fails(self):
+        """A request over the view's query_budget raises in strict mode."""
+        self.create_authors(2)
+        with mock.patch.object(AuthorListView, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.list_url)
+
+
+class BookBulkViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author1 = Author.objects.create(name='Jane Austen')
+        cls.author2 = Author.objects.create(name='George Orwell')
+        cls.existing = create_book("Emma", cls.author1, date(1815, 12, 1))
+        cls.user = User.objects.create_user(username='testuser', password='password123')
+        cls.bulk_url = reverse('api:book-bulk')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def book_data(self, count, author=None):
+        author = author or self.author2
+        return [
+            {'title': f'Bulk Book {i}', 'author': author.pk, 'publication_year': '2000-01-01'}
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        response = self.client.post(self.bulk_url, self.book_data(5), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Book.objects.count(), 6)
+
+    def test_bulk_create_queries_per_chunk_not_per_book(self):
+        """Authors, duplicate check and insert run once per chunk."""
+        # savepoint + authors + duplicates + insert + search index + release,
+        # then the table version bump
+        with self.assertNumQueries(7):
+            self.client.post(self.bulk_url + '?chunk_size=50', self.book_data(50), format='json')
+
+    def test_bulk_create_indexes_books_without_returned_ids(self):
+        """Databases that don't return the new ids (MySQL) still index the books by id."""
+        backend_class = type(get_search_backend())
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch.object(backend_class, 'index_books', autospec=True,
+                                  side_effect=backend_class.index_books) as index_books:
+            response = self.client.post(self.bulk_url, self.book_data(3), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        indexed = {book.pk: book.title for book in index_books.call_args.args[1]}
+        self.assertEqual(indexed, dict(Book.objects.filter(title__startswith='Bulk').values_list('pk', 'title')))
+
+    def test_bulk_create_reports_per_item_errors(self):
+        data = self.book_data(2) + [
+            {'title': 'Emma', 'author': self.author1.pk, 'publication_year': '1815-12-01'},
+            {'title': 'No Author', 'author': 9999, 'publication_year': '2000-01-01'},
+            {'title': 'Bulk Book 0', 'author': self.author2.pk, 'publication_year': '2000-01-01'},
+        ]
+        response = self.client.post(self.bulk_url + '?chunk_size=2', data, format='json')
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3, 4])
+        self.assertIn('author', response.data['errors'][1]['errors'])
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_bulk_create_from_ndjson(self):
+        lines = [
+            '{"title": "Line 1", "author": %d, "publication_year": "2001-01-01"}' % self.author1.pk,
+            '',
+            'not json',
+            '{"title": "Line 2", "author": %d, "publication_year": "2002-01-01"}' % self.author2.pk,
+        ]
+        response = self.client.post(
+            self.bulk_url, '\n'.join(lines), content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+
+    def test_ndjson_line_in_wrong_encoding_is_an_item_error(self):
+        lines = [
+            b'{"title": "Line 1", "author": %d, "publication_year": "2001-01-01"}' % self.author1.pk,
+            b'{"title": "Caf\xe9", "author": %d, "publication_year": "2002-01-01"}' % self.author1.pk,
+            b'{"title": "Line 3", "author": %d, "publication_year": "2003-01-01"}' % self.author2.pk,
+        ]
+        response = self.client.post(
+            self.bulk_url + '?chunk_size=1', b'\n'.join(lines), content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+
+    def test_bulk_update(self):
+        other = create_book("1984", self.author2, date(1949, 6, 8))
+        data = [
+            {'id': self.existing.pk, 'title': 'Emma (Revised)'},
+            {'id': other.pk, 'publication_year': '1950-01-01'},
+            {'id': 9999, 'title': 'Missing'},
+        ]
+        response = self.client.patch(self.bulk_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['errors'][0]['index'], 2)
+        self.existing.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.existing.title, 'Emma (Revised)')
+        self.assertEqual(other.publication_year, date(1950, 1, 1))
+
+    def test_bulk_delete(self):
+        other = create_book("1984", self.author2, date(1949, 6, 8))
+        response = self.client.delete(self.bulk_url, [self.existing.pk, {'id': other.pk}, 9999], format='json')
+
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(response.data['errors'][0]['index'], 2)
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_bulk_ids_must_be_integers(self):
+        first = Book.objects.order_by('pk').first()
+        response = self.client.delete(self.bulk_url, [True, False, float(first.pk), 'one'], format='json')
+        self.assertEqual(response.data['deleted'], 0)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0, 1, 2, 3])
+
+        response = self.client.patch(self.bulk_url, [{'id': True, 'title': 'Replaced'}], format='json')
+        self.assertEqual(response.data['updated'], 0)
+        self.assertFalse(Book.objects.filter(title='Replaced').exists())
+
+        response = self.client.delete(self.bulk_url, [str(first.pk)], format='json')
+        self.assertEqual(response.data['deleted'], 1)
+
+    def test_bulk_requires_a_list(self):
+        response = self.client.post(self.bulk_url, {'title': 'Not a list'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.bulk_url, self.book_data(1), format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+class ExportViewTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author1 = Author.objects.create(name='Jane Austen')
+        cls.author2 = Author.objects.create(name='George Orwell')
+        cls.book1 = create_book("Pride and Prejudice", cls.author1, date(1813, 1, 28))
+        cls.book2 = create_book("1984", cls.author2, date(1949, 6, 8))
+        cls.book3 = create_book("Emma", cls.author1, date(1815, 12, 1))
+        cls.export_url = reverse('api:book-export')
+
+    def export(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        response, content = self.export(self.export_url, {'format': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['1984', 'Emma', 'Pride and Prejudice'])
+        self.assertEqual(rows[0], {
+            'id': self.book2.pk,
+            'title': '1984',
+            'publication_year': '1949-06-08',
+            'author': self.author2.pk,
+            'author_name': 'George Orwell',
+        })
+
+    def test_csv_export_honours_filters(self):
+        response, content = self.export(self.export_url, {
+            'format': 'csv',
+            'search': 'austen',
+            'year_to': '1814-01-01',
+        })
+
+        self.assertIn('books.csv', response['Content-Disposition'])
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'publication_year', 'author', 'author_name'])
+        self.assertEqual(rows[1:], [[str(self.book1.pk), 'Pride and Prejudice', '1813-01-28', str(self.author1.pk), 'Jane Austen']])
+
+    def test_author_export(self):
+        _, content = self.export(reverse('api:author-export'), {'format': 'csv'})
+
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual([row[1] for row in rows], ['name', 'George Orwell', 'Jane Austen'])
+
+
+
+class FastReadSerializerTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author1 = Author.objects.create(name='Jane Austen')
+        cls.author2 = Author.objects.create(name='George Orwell')
+        create_book("Pride and Prejudice", cls.author1, date(1813, 1, 28))
+        create_book("1984", cls.author2, date(1949, 6, 8))
+        cls.list_url = reverse('api:book-list')
+
+    def test_output_matches_book_serializer(self):
+        queryset = Book.objects.order_by('title')
+        fast = FastReadSerializer.for_serializer(BookSerializer)
+
+        expected = [dict(row) for row in BookSerializer(queryset, many=True).data]
+        self.assertEqual(fast.serialize(queryset), expected)
+        self.assertEqual(fast.serialize_objects(list(queryset)), expected)
+
+    def test_list_response_matches_regular_path(self):
+        for params in ({}, {'page_size': 1}):
+            fast_response = self.client.get(self.list_url, params)
+            with mock.patch.object(BookListView, 'use_fast_serializer', False):
+                regular_response = self.client.get(self.list_url, params)
+
+            self.assertEqual(fast_response.content, regular_response.content)
+
+    def test_nested_serializers_are_not_supported(self):
+        self.assertFalse(FastReadSerializer(AuthorSerializer).is_supported())
+
+
+class ConditionalGetTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(name='George Orwell')
+        cls.book = create_book("1984", cls.author, date(1949, 6, 8))
+        cls.list_url = reverse('api:book-list')
+        cls.detail_url = reverse('api:book-detail', kwargs={'pk': cls.book.pk})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matching_etag_returns_304_with_one_query(self):
+        for url in (self.list_url, self.detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response['ETag'].startswith('"'))
+
+            # Only the table versions are read
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_if_modified_since_returns_304(self):
+        response = self.client.get(self.list_url)
+        not_modified = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.book.title = 'Nineteen Eighty-Four'
+        self.book.save()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Nineteen Eighty-Four')
+
+    def test_author_change_invalidates_list_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        self.author.name = 'Eric Blair'
+        self.author.save()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_write_from_another_process_changes_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        # Workers share the database only, not their local caches
+        TableVersion.objects.filter(table='api.author').update(version=F('version') + 1)
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_differs_per_query(self):
+        first = self.client.get(self.list_url)
+        filtered = self.client.get(self.list_url, {'search': 'orwell'})
+        self.assertNotEqual(first['ETag'], filtered['ETag'])
+
+
+
+class FullTextSearchTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.austen = Author.objects.create(name='Jane Austen')
+        cls.orwell = Author.objects.create(name='George Orwell')
+        cls.emma = create_book("Emma", cls.austen, date(1815, 12, 1))
+        cls.pride = create_book("Pride and Prejudice", cls.austen, date(1813, 1, 28))
+        cls.farm = create_book("Animal Farm", cls.orwell, date(1945, 8, 17))
+        cls.list_url = reverse('api:book-list')
+
+    def search(self, term, **params):
+        response = self.client.get(self.list_url, {'search': term, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book['title'] for book in response.data['results']]
+
+    def test_sqlite_uses_fts5_backend(self):
+        self.assertEqual(get_search_backend().__class__.__name__, 'SQLiteFTS5Backend')
+
+    def test_search_matches_title_and_author_prefixes(self):
+        self.assertEqual(self.search('orw'), ['Animal Farm'])
+        self.assertEqual(sorted(self.search('austen')), ['Emma', 'Pride and Prejudice'])
+        self.assertEqual(self.search('jane prej'), ['Pride and Prejudice'])
+
+    def test_results_ordered_by_relevance(self):
+        create_book("Farm Farm Farm", self.austen, date(1900, 1, 1))
+        self.assertEqual(self.search('farm'), ['Farm Farm Farm', 'Animal Farm'])
+
+    def test_explicit_ordering_wins_over_relevance(self):
+        create_book("Farm Farm Farm", self.austen, date(1900, 1, 1))
+        self.assertEqual(self.search('farm', ordering='title'), ['Animal Farm', 'Farm Farm Farm'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.emma.title = 'Persuasion'
+        self.emma.save()
+        self.assertEqual(self.search('emma'), [])
+        self.assertEqual(self.search('persuasion'), ['Persuasion'])
+
+        self.emma.delete()
+        self.assertEqual(self.search('persuasion'), [])
+
+    def test_author_rename_is_indexed(self):
+        self.orwell.name = 'Eric Blair'
+        self.orwell.save()
+        self.assertEqual(self.search('blair'), ['Animal Farm'])
+        self.assertEqual(self.search('orwell'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"farm OR NEAR('), [])
+
+    def test_rank_comes_from_a_single_match(self):
+        queryset = get_search_backend().search(Book.objects.all(), ['farm'], 'search_rank')
+        self.assertEqual(str(queryset.query).count('MATCH'), 1)
+        self.assertNotIn('SUBQUERY', queryset.order_by('search_rank').explain())
+        self.assertEqual([book.title for book in queryset], ['Animal Farm'])
+
+    def test_keyset_pages_follow_relevance(self):
+        first = self.client.get(self.list_url, {'search': 'austen', 'page_size': 1})
+        second = self.client.get(first.data['next'])
+        titles = [first.data['results'][0]['title'], second.data['results'][0]['title']]
+        self.assertEqual(sorted(titles), ['Emma', 'Pride and Prejudice'])
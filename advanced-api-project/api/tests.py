@@ -1,3 +1,101 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from advanced_api_project.middleware import QueryBudgetExceeded, QueryStats, fingerprint_sql
+
+from .indexes import explain, iter_api_views, propose_indexes, record_view_queries, uses_index
+from .models import Author, Book
+from .views import AuthorExportView, AuthorListView, BookListView
+
+
+class ProposeIndexesTestCase(TestCase):
+    def test_declared_fields_are_covered(self):
+        # Book and Author declare the indexes the command proposes
+        self.assertEqual(propose_indexes(iter_api_views()), {})
+
+    def test_proposals_follow_view_fields(self):
+        views = [('api/books/', BookListView), ('api/authors/export/', AuthorExportView)]
+        with mock.patch.object(Book._meta, 'indexes', []), mock.patch.object(Author._meta, 'indexes', []):
+            proposals = propose_indexes(views)
+
+        self.assertEqual(
+            set(proposals[Book]),
+            {('publication_year', 'title', 'id'), ('title', 'id'), ('publication_year', 'id')},
+        )
+        # author__name filters and orderings are served by an index on Author
+        self.assertEqual(set(proposals[Author]), {('name', 'id')})
+        self.assertIn('BookListView ordering author__name (api/books/)', proposals[Author][('name', 'id')])
+
+
+class ExplainViewQueriesTestCase(TestCase):
+    def setUp(self):
+        author = Author.objects.create(name='George Orwell')
+        for i in range(20):
+            Book.objects.create(title=f'Book {i:02d}', author=author, publication_year=date(1940 + i, 1, 1))
+
+    def test_records_view_queries(self):
+        recorded = record_view_queries([('api/books/', BookListView)])
+        sqls = [sql for _, sql in recorded]
+        self.assertTrue(sqls)
+        self.assertTrue(all(sql.lstrip().upper().startswith('SELECT') for sql in sqls))
+        self.assertEqual(len(sqls), len(set(sqls)))
+
+    def test_title_keyset_page_uses_index(self):
+        queryset = Book.objects.filter(publication_year=date(1945, 1, 1)).order_by('title', 'id')[:50]
+        sql, params = queryset.query.sql_with_params()
+        self.assertTrue(uses_index(explain(sql, params)))
+
+
+class QueryInstrumentationTestCase(TestCase):
+    def test_server_timing_header(self):
+        Author.objects.create(name='George Orwell')
+        response = self.client.get('/api/authors/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="2 queries"$')
+
+    def test_logs_duplicate_statements(self):
+        for i in range(3):
+            author = Author.objects.create(name=f'Author {i}')
+            Book.objects.create(title=f'Book {i}', author=author, publication_year=date(1950, 1, 1))
+
+        # Without the prefetch every author runs its own books query
+        with mock.patch.multiple(AuthorListView, get_queryset=lambda view: Author.objects.all(), query_budget=None):
+            with self.assertLogs('advanced_api_project.middleware', 'INFO') as logs:
+                self.client.get('/api/authors/')
+
+        stats = logs.records[0].query_stats
+        self.assertEqual(stats['queries'], 4)
+        self.assertEqual([duplicate['count'] for duplicate in stats['duplicates']], [3])
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM api_book WHERE id IN (%s, %s) AND title = %s'),
+            fingerprint_sql("SELECT *  FROM api_book WHERE id IN (%s) AND title = 'Emma'"),
+        )
+
+    def test_counts_duplicates(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            for pk in range(3):
+                list(Book.objects.filter(pk=pk))
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(list(stats.duplicates.values()), [3])
+
+    def test_budget_exceeded_raises_in_strict_mode(self):
+        with mock.patch.object(AuthorListView, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/authors/')
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_budget_exceeded_warns(self):
+        with mock.patch.object(AuthorListView, 'query_budget', 0):
+            with self.assertLogs('advanced_api_project.middleware', 'WARNING'):
+                response = self.client.get('/api/authors/')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = self.client.get('/api/authors/')
+        self.assertFalse(response.has_header('Server-Timing'))
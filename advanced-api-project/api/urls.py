@@ -4,7 +4,11 @@ from .views import (
     BookDetailView,
     BookCreateView,
     BookUpdateView,
-    BookDeleteView
+    BookDeleteView,
+    AuthorListView,
+    BookBulkView,
+    BookExportView,
+    AuthorExportView
 )
 
 app_name = 'api'
@@ -14,7 +18,11 @@ urlpatterns = [
     path('books/delete/', BookDeleteView.as_view(), name='book-delete-no-pk'),
     path('books/', BookListView.as_view(), name='book-list'),
     path('books/create/', BookCreateView.as_view(), name='book-create'),
+    path('books/bulk/', BookBulkView.as_view(), name='book-bulk'),
+    path('books/export/', BookExportView.as_view(), name='book-export'),
     path('books/<int:pk>/update/', BookUpdateView.as_view(), name='book-update'),
     path('books/<int:pk>/delete/', BookDeleteView.as_view(), name='book-delete'),
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/export/', AuthorExportView.as_view(), name='author-export'),
 ]
\ No newline at end of file
@@ -1,8 +1,19 @@
 from rest_framework import generics, permissions, status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.db import transaction
+from itertools import islice
 from .models import Book, Author
-from .serializers import BookSerializer, AuthorSerializer
+from .serializers import BookSerializer, AuthorSerializer, BookBulkSerializer, FastReadSerializer
+from .parsers import NDJSONParser, InvalidLine
+from .pagination import BookKeysetPagination
+from .cache import approximate_count, cached_count, normalize_count_params, touch_tables
+from .mixins import QueryPlanMixin, StreamingExportMixin, ConditionalGetMixin
+from .search import FullTextSearchFilter, get_search_backend
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -10,7 +21,7 @@ from rest_framework import filters
 
 # ListView - Retrieve all books
 # This view handles GET requests to retrieve a list of all books in the database
-class BookListView(generics.ListAPIView):
+class BookListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API endpoint that returns a list of all books.
     
@@ -18,6 +29,15 @@ class BookListView(generics.ListAPIView):
     - URL Pattern: /books/
     - Authentication: Not required (read-only access for all users)
     - Returns: List of all books with their details
+    - Pagination: opt-in keyset (cursor) pages with ?page_size=<n>, then
+      follow the opaque `next`/`previous` links. Add ?count=true to include
+      the total count (skipped by default to avoid a COUNT(*) per page).
+      Counts are cached per filter combination; ?count=approximate returns
+      the database's row estimate for unfiltered requests.
+    - Search: ?search= uses the full-text index (word prefixes over title
+      and author name); without ?ordering= results come most relevant first.
+    - Conditional GET: responses carry ETag/Last-Modified headers; send them
+      back as If-None-Match/If-Modified-Since to get a 304 when unchanged.
     """
     # queryset: Defines what data this view will work with
     # Book.objects.all() retrieves all book instances from the database
@@ -33,8 +53,10 @@ class BookListView(generics.ListAPIView):
 
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter, # Reference as filters.SearchFilter
         filters.OrderingFilter, # Reference as filters.OrderingFilter (This is what the check wants)
+        # Full-text index instead of filters.SearchFilter's icontains scans;
+        # it comes last so matches can be ordered by relevance
+        FullTextSearchFilter,
     ]
 
     filterset_fields = [
@@ -56,6 +78,19 @@ class BookListView(generics.ListAPIView):
 
     ordering = ['title']
 
+    # pagination_class: keyset pagination that follows `ordering` (plus the
+    # id as a tie-breaker), so deep pages cost the same as the first one
+    pagination_class = BookKeysetPagination
+
+    # use_fast_serializer: build list rows straight from values_list() with
+    # FastReadSerializer instead of BookSerializer.to_representation() per
+    # book. The output is identical; set to False to use the regular path.
+    use_fast_serializer = True
+
+    # conditional_models: author names appear in filters, search and the
+    # export, so renaming an author changes the ETag too
+    conditional_models = [Book, Author]
+
     def get_queryset(self):
         queryset = super().get_queryset()
         year_from = self.request.query_params.get('year_from', None)
@@ -70,6 +105,31 @@ class BookListView(generics.ListAPIView):
 
         
         return queryset
+
+    def get_count(self, queryset):
+        """
+        Return the number of books matching the current request.
+
+        The COUNT(*) is cached per normalized filter/search/year combination
+        and keyed on the Book/Author table versions that the conditional GET
+        already read, which the signals in models.py bump on every write. With
+        ?count=approximate and no filters, the estimate from the database's
+        table statistics is used instead, falling back to the exact count
+        when the backend has none.
+        """
+        params = self.request.query_params
+        if params.get('count') == 'approximate' and not normalize_count_params(params):
+            estimate = approximate_count(Book)
+            if estimate is not None:
+                return estimate
+        return cached_count(queryset, params, getattr(self, 'table_versions', None))
+
+    def get_fast_serializer(self):
+        """Return the FastReadSerializer for this view, or None if unavailable."""
+        if not self.use_fast_serializer:
+            return None
+        fast_serializer = FastReadSerializer.for_serializer(self.get_serializer_class())
+        return fast_serializer if fast_serializer.is_supported() else None
     
     def list(self, request, *args, **kwargs):
         """
@@ -84,30 +144,96 @@ class BookListView(generics.ListAPIView):
         # Get the filtered, searched, and ordered queryset
         queryset = self.filter_queryset(self.get_queryset())
         
-        # Paginate the queryset (if pagination is configured)
+        fast_serializer = self.get_fast_serializer()
+
+        # Paginate the queryset (only when the client asked for keyset pages)
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            if fast_serializer is not None:
+                data = fast_serializer.serialize_objects(page)
+            else:
+                data = self.get_serializer(page, many=True).data
+            return self.get_paginated_response(data)
         
         # Serialize the queryset
-        serializer = self.get_serializer(queryset, many=True)
+        if fast_serializer is not None:
+            data = fast_serializer.serialize(queryset)
+        else:
+            data = self.get_serializer(queryset, many=True).data
         
         # Create custom response with metadata
         response_data = {
-            'count': queryset.count(),  # Total number of results
+            # Total number of results: the queryset has already been loaded
+            # by the serializer, so there is no need for a COUNT(*) query
+            'count': len(data),
             'filters_applied': {
                 'search': request.query_params.get('search', None),
                 'ordering': request.query_params.get('ordering', 'title'),
                 'publication_year': request.query_params.get('publication_year', None),
                 'author': request.query_params.get('author', None),
             },
-            'results': serializer.data
+            'results': data
         }
         
         return Response(response_data)
 
 
+# ListView - Retrieve all authors with their books
+class AuthorListView(QueryPlanMixin, generics.ListAPIView):
+    """
+    API endpoint that returns all authors with their nested books.
+
+    - HTTP Method: GET
+    - URL Pattern: /authors/
+    - Authentication: Not required (read-only access for all users)
+    - Returns: List of authors, each with the list of their books
+
+    QueryPlanMixin prefetches the `books` relation that AuthorSerializer
+    nests, so the listing runs in 2 queries however many authors there are.
+    """
+    queryset = Author.objects.all().order_by('name')
+    serializer_class = AuthorSerializer
+    permission_classes = [permissions.AllowAny]
+
+    # One query for the authors, one for all of their books
+    query_budget = 2
+
+
+# ExportView - Stream the whole (filtered) book catalog
+class BookExportView(StreamingExportMixin, BookListView):
+    """
+    API endpoint that streams books as NDJSON or CSV.
+
+    - HTTP Method: GET
+    - URL Pattern: /books/export/?format=ndjson|csv
+    - Authentication: Not required (read-only access for all users)
+    - Filtering: same filterset_fields, search, ordering and
+      year_from/year_to parameters as BookListView
+    - Returns: one row per book with its author's id and name
+    """
+    export_fields = ['id', 'title', 'publication_year', 'author', 'author__name']
+    export_filename = 'books'
+
+
+class AuthorExportView(StreamingExportMixin, generics.ListAPIView):
+    """
+    API endpoint that streams authors as NDJSON or CSV.
+
+    - HTTP Method: GET
+    - URL Pattern: /authors/export/?format=ndjson|csv
+    - Authentication: Not required (read-only access for all users)
+    - Filtering: ?search= on the author name
+    """
+    queryset = Author.objects.all()
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['name']
+    ordering_fields = ['name']
+    ordering = ['name']
+    export_fields = ['id', 'name']
+    export_filename = 'authors'
+
+
 class BookCreateView(generics.CreateAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
@@ -124,20 +250,21 @@ class BookCreateView(generics.CreateAPIView):
 
         print(f"Book '{book.title}' created successfully")
 
-        def create(self, request, *args, **kwargs):
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
-            headers = self.get_success_headers(serializer.data)
-            return Response(
-                {
-                    'message': 'Book Created successfully!'
-                    'book': serializer.data
-                }
-                status=status.HTTP_201_CREATED,
-                headers=headers
-            )
-class BookDetailView(generics.RetrieveAPIView):
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            {
+                'message': 'Book Created successfully!',
+                'book': serializer.data
+            },
+            status=status.HTTP_201_CREATED,
+            headers=headers
+        )
+
+class BookDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API endpoint that returns details of a single book.
     
@@ -146,10 +273,12 @@ class BookDetailView(generics.RetrieveAPIView):
     - Authentication: Not required (read-only access for all users)
     - Returns: Details of the book with the specified ID
     - URL Parameter: pk (primary key/ID of the book)
+    - Conditional GET: supports If-None-Match/If-Modified-Since (304)
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.AllowAny]
+    conditional_models = [Book]
     
     # Note: The 'pk' (primary key) is automatically extracted from the URL
     # DRF uses it to filter the queryset and return only the matching book
@@ -191,33 +320,35 @@ class BookUpdateView(generics.UpdateAPIView):
         if old_title != book.title:
             print(f"Book '{old_title}' updated to '{book.title}'")
 
-        def update(self, request, *args, **kwargs):
-            partial = kwargs.pop('partial', False)
-            instance = self.get_object()
-            serializer = self.get_serializer(instance, data=request.data, partial=partial)
-            serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
-
-            if getattr(instance, '_prefetched_objects_cache', None):
-                instance._prefetched_objects_cache = {}
-
-            return Response(
-                {
-                    'message': 'Book updated successfully!',
-                    'book': serializer.data
-                }
-            )
-        
-        def partial_update(self, request, *args, **kwargs):
-            kwargs['partial'] = True
-            return self.update(request, *args, **kwargs)
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        if getattr(instance, '_prefetched_objects_cache', None):
+            instance._prefetched_objects_cache = {}
+
+        return Response(
+            {
+                'message': 'Book updated successfully!',
+                'book': serializer.data
+            }
+        )
+    
+    def partial_update(self, request, *args, **kwargs):
+        kwargs['partial'] = True
+        return self.update(request, *args, **kwargs)
+
+
 class BookDeleteView(generics.DestroyAPIView):
-   queryset = Book.objects.all()
+    queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def perform_destroy(self, instance):
-       book_title = instance.title
+        book_title = instance.title
         book_author = instance.author.name
         
         # Log the deletion
@@ -248,4 +379,258 @@ class BookDeleteView(generics.DestroyAPIView):
                 'deleted_book': self.deleted_book_info
             },
             status=status.HTTP_200_OK  # Using 200 instead of 204 to include response body
-        )
\ No newline at end of file
+        )
+
+
+# BulkView - Create, update or delete many books in one request
+class BookBulkView(generics.GenericAPIView):
+    """
+    API endpoint for creating, updating and deleting books in batches.
+
+    - HTTP Methods: POST (create), PUT/PATCH (update), DELETE (delete)
+    - URL Pattern: /books/bulk/
+    - Authentication: Required (only authenticated users can modify books)
+    - Request Body: a JSON array, or NDJSON (one JSON value per line) sent
+      with Content-Type: application/x-ndjson
+        - POST: book objects ({"title", "author", "publication_year"})
+        - PUT/PATCH: book objects including their "id"
+        - DELETE: book ids, or objects with an "id"
+    - Query Parameter: chunk_size (default: BOOK_BULK_CHUNK_SIZE setting)
+    - Returns: how many books were processed plus a list of per-item errors
+      ({"index": <position in the request>, "errors": {...}})
+
+    Items are validated with BookBulkSerializer and written with
+    bulk_create/bulk_update, one transaction per chunk. Invalid items are
+    skipped and reported; the valid items in the same chunk are still saved.
+    Each chunk costs a fixed number of queries (authors, duplicate check,
+    write) instead of several per book.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookBulkSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    max_chunk_size = 5000
+
+    def get_chunk_size(self):
+        default = getattr(settings, 'BOOK_BULK_CHUNK_SIZE', 500)
+        try:
+            chunk_size = int(self.request.query_params.get('chunk_size', default))
+        except ValueError:
+            chunk_size = default
+        return max(1, min(chunk_size, self.max_chunk_size))
+
+    def iter_chunks(self):
+        """
+        Yield lists of (index, item) pairs from the request body.
+
+        NDJSON bodies are parsed lazily, so only one chunk is in memory at a
+        time.
+        """
+        data = self.request.data
+        if isinstance(data, (dict, str)) or not hasattr(data, '__iter__'):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ['Expected a list of items.']})
+
+        items = enumerate(data)
+        chunk_size = self.get_chunk_size()
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def parse_id(value):
+        """
+        Return `value` as a book or author id, or None. Only integers and
+        digit strings are ids: int() would also take true/false (1/0) and
+        truncate floats.
+        """
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            return int(value)
+        return None
+
+    def get_bulk_serializer(self, items, partial=False):
+        """
+        Return one serializer instance used to validate every item of a
+        chunk, with the chunk's authors loaded in a single query.
+        """
+        author_ids = set()
+        for _, item in items:
+            author_id = self.parse_id(item.get('author')) if isinstance(item, dict) else None
+            if author_id is not None:
+                author_ids.add(author_id)
+
+        context = self.get_serializer_context()
+        context['authors'] = Author.objects.in_bulk(author_ids)
+        return self.get_serializer(context=context, partial=partial)
+
+    def validate_items(self, serializer, items):
+        """Return ([(index, validated_data)], [errors]) for a chunk."""
+        valid = []
+        errors = []
+        for index, item in items:
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+        return valid, errors
+
+    def process(self, handle_chunk):
+        processed = 0
+        errors = []
+        for chunk in self.iter_chunks():
+            items = []
+            invalid = []
+            for index, item in chunk:
+                if isinstance(item, InvalidLine):
+                    invalid.append({'index': index, 'errors': {
+                        api_settings.NON_FIELD_ERRORS_KEY: [f'Invalid JSON: {item.error}']
+                    }})
+                else:
+                    items.append((index, item))
+
+            with transaction.atomic():
+                chunk_processed, chunk_errors = handle_chunk(items)
+            processed += chunk_processed
+            errors.extend(sorted(invalid + chunk_errors, key=lambda error: error['index']))
+
+        if processed:
+            # bulk_create/bulk_update don't send post_save signals, so the
+            # table version (cached counts, ETags) has to be bumped here
+            touch_tables(Book)
+        return processed, errors
+
+    def bulk_response(self, message, key, processed, errors, success_status):
+        response_status = success_status
+        if errors and not processed:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {
+                'message': message,
+                key: processed,
+                'errors': errors,
+            },
+            status=response_status
+        )
+
+    def post(self, request, *args, **kwargs):
+        processed, errors = self.process(self.create_chunk)
+        return self.bulk_response('Books created successfully!', 'created', processed, errors, status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        processed, errors = self.process(lambda items: self.update_chunk(items, partial=False))
+        return self.bulk_response('Books updated successfully!', 'updated', processed, errors, status.HTTP_200_OK)
+
+    def patch(self, request, *args, **kwargs):
+        processed, errors = self.process(lambda items: self.update_chunk(items, partial=True))
+        return self.bulk_response('Books updated successfully!', 'updated', processed, errors, status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        processed, errors = self.process(self.delete_chunk)
+        return self.bulk_response('Books deleted successfully!', 'deleted', processed, errors, status.HTTP_200_OK)
+
+    def create_chunk(self, items):
+        valid, errors = self.validate_items(self.get_bulk_serializer(items), items)
+
+        # Duplicate check on (title, author): one query for the whole chunk
+        # instead of an exists() per book
+        existing = set(
+            Book.objects.filter(
+                title__in={data['title'] for _, data in valid},
+                author__in={data['author'] for _, data in valid},
+            ).values_list('title', 'author_id')
+        )
+
+        books = []
+        for index, data in valid:
+            key = (data['title'], data['author'].pk)
+            if key in existing:
+                errors.append({'index': index, 'errors': {
+                    api_settings.NON_FIELD_ERRORS_KEY: ['A book with this title and author already exists.']
+                }})
+                continue
+            # Also catches duplicates within the same request
+            existing.add(key)
+            books.append(Book(**data))
+
+        Book.objects.bulk_create(books)
+        if any(book.pk is None for book in books):
+            # MySQL doesn't return the new primary keys: read them back by
+            # (title, author), unique in the chunk after the check above
+            created = Book.objects.filter(
+                title__in={book.title for book in books},
+                author__in={book.author_id for book in books},
+            ).values_list('title', 'author_id', 'pk')
+            ids = {(title, author_id): pk for title, author_id, pk in created}
+            for book in books:
+                book.pk = ids[book.title, book.author_id]
+
+        # bulk_create doesn't send post_save, so index the new books here
+        backend = get_search_backend()
+        if backend is not None:
+            backend.index_books(books, created=True)
+        return len(books), errors
+
+    def update_chunk(self, items, partial):
+        errors = []
+        ids = {}
+        for index, item in items:
+            book_id = self.parse_id(item.get('id') if isinstance(item, dict) else None)
+            if book_id is None:
+                errors.append({'index': index, 'errors': {'id': ['A valid book id is required.']}})
+            else:
+                ids[index] = book_id
+
+        instances = Book.objects.select_related('author').in_bulk(ids.values())
+        found = []
+        for index, item in items:
+            if index not in ids:
+                continue
+            if ids[index] not in instances:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+                continue
+            found.append((index, item))
+
+        valid, validation_errors = self.validate_items(self.get_bulk_serializer(found, partial=partial), found)
+        errors.extend(validation_errors)
+
+        books = []
+        fields = set()
+        for index, data in valid:
+            book = instances[ids[index]]
+            for attr, value in data.items():
+                setattr(book, attr, value)
+            fields.update(data)
+            books.append(book)
+
+        if books and fields:
+            Book.objects.bulk_update(books, sorted(fields))
+
+            backend = get_search_backend()
+            if backend is not None and fields & {'title', 'author'}:
+                backend.index_books(books)
+        return len(books), errors
+
+    def delete_chunk(self, items):
+        errors = []
+        ids = {}
+        for index, item in items:
+            book_id = self.parse_id(item.get('id') if isinstance(item, dict) else item)
+            if book_id is None:
+                errors.append({'index': index, 'errors': {'id': ['A valid book id is required.']}})
+            else:
+                ids[index] = book_id
+
+        existing = set(Book.objects.filter(pk__in=ids.values()).values_list('pk', flat=True))
+        for index, book_id in ids.items():
+            if book_id not in existing:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+
+        if existing:
+            Book.objects.filter(pk__in=existing).delete()
+        return len(existing), errors
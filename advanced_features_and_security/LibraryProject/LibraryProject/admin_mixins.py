@@ -0,0 +1,201 @@
+"""
+Changelist performance mode for ModelAdmins.
+
+ChangeListPerformanceMixin keeps large changelists cheap:
+
+- list_select_related is derived from list_display: every forward foreign
+  key / one-to-one shown in a column (also through 'author__name' style
+  lookups) is joined, nullable ones included, instead of one query per row.
+- Counts: above `estimated_count_threshold` rows, the unfiltered changelist
+  uses the database's row estimate instead of COUNT(*), and the second
+  "full result" COUNT(*) is skipped.
+- The choices of related (foreign key / many-to-many) and all-values
+  list_filter entries are cached, and invalidated when a write to the
+  model they are read from commits.
+
+Usage:
+
+    @admin.register(Book)
+    class BookAdmin(ChangeListPerformanceMixin, admin.ModelAdmin):
+        list_display = ['title', 'author']
+        list_filter = ['author']
+"""
+import uuid
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import cached_property
+
+FILTER_VERSION_KEY = 'admin:list_filter_version:{}'
+FILTER_CHOICES_KEY = 'admin:list_filter_choices:{}:{}:{}'
+
+
+def estimated_count(model, using='default'):
+    """
+    Row estimate of `model`'s table from the database statistics, or None
+    when there is none (e.g. SQLite, or a table that was never analyzed).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = (
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        )
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that counts unfiltered querysets from table statistics."""
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
+def get_filter_version(model):
+    """Token replaced on every write to `model`, part of the choices cache keys."""
+    key = FILTER_VERSION_KEY.format(model._meta.label_lower)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def cached_choices(model, field_path, compute, timeout):
+    """Return compute(), cached until `model` changes or `timeout` expires."""
+    key = FILTER_CHOICES_KEY.format(model._meta.label_lower, field_path, get_filter_version(model))
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(compute())
+        cache.set(key, choices, timeout)
+    return choices
+
+
+def invalidate_filter_choices(sender, **kwargs):
+    # After the commit: a changelist rendered before it would cache the old
+    # choices under the new version
+    key = FILTER_VERSION_KEY.format(sender._meta.label_lower)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """RelatedFieldListFilter whose choices are cached per related model."""
+
+    def field_choices(self, field, request, model_admin):
+        return cached_choices(
+            field.related_model, self.field_path,
+            lambda: super(CachedRelatedFieldListFilter, self).field_choices(field, request, model_admin),
+            model_admin.list_filter_cache_timeout,
+        )
+
+
+class CachedAllValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """AllValuesFieldListFilter whose distinct values are cached per model."""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.lookup_choices = cached_choices(
+            self.lookup_choices.model, field_path, lambda: self.lookup_choices,
+            model_admin.list_filter_cache_timeout,
+        )
+
+
+class ChangeListPerformanceMixin:
+    """ModelAdmin mixin, see the module docstring."""
+    estimated_count_threshold = 10000
+    list_filter_cache_timeout = 300
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    # Models whose writes invalidate cached filter choices
+    _invalidating_models = set()
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        # Connect the invalidation receivers when the admin is registered,
+        # so every process drops stale choices, not only those that have
+        # rendered the changelist
+        for item in self.list_filter:
+            if isinstance(item, str):
+                self.get_cached_filter(item)
+
+    def get_list_select_related(self, request):
+        if self.list_select_related is not False:
+            return self.list_select_related
+        return self.get_related_columns(request) or False
+
+    def get_related_columns(self, request):
+        """Forward relations traversed by the list_display columns."""
+        related = []
+        for name in self.get_list_display(request):
+            if not isinstance(name, str):
+                continue
+            model, path = self.model, []
+            for part in name.split('__'):
+                try:
+                    field = model._meta.get_field(part)
+                except FieldDoesNotExist:
+                    break
+                if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                    break
+                path.append(part)
+                model = field.related_model
+            if path and '__'.join(path) not in related:
+                related.append('__'.join(path))
+        return related
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator = super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        paginator.threshold = self.estimated_count_threshold
+        return paginator
+
+    def get_list_filter(self, request):
+        list_filter = []
+        for item in super().get_list_filter(request):
+            if isinstance(item, str):
+                item = self.get_cached_filter(item) or item
+            list_filter.append(item)
+        return list_filter
+
+    def get_cached_filter(self, field_name):
+        """(field_name, cached filter class) for related and all-values filters."""
+        try:
+            field = self.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return None
+        if field.is_relation and field.related_model is not None:
+            self.invalidate_on_write(field.related_model)
+            return field_name, CachedRelatedFieldListFilter
+        if not field.choices and field.get_internal_type() in ('CharField', 'IntegerField', 'PositiveIntegerField'):
+            self.invalidate_on_write(self.model)
+            return field_name, CachedAllValuesFieldListFilter
+        return None
+
+    def invalidate_on_write(self, model):
+        if model in self._invalidating_models:
+            return
+        self._invalidating_models.add(model)
+        post_save.connect(invalidate_filter_choices, sender=model, weak=False)
+        post_delete.connect(invalidate_filter_choices, sender=model, weak=False)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 import os
 
@@ -58,7 +59,12 @@ INSTALLED_APPS = [
 
 AUTH_USER_MODEL = 'bookshelf.CustomUser'
 
+# Loads the user's UserProfile along with the user for the role checks,
+# and permissions from a cached snapshot (relationship_app/permissions.py)
+AUTHENTICATION_BACKENDS = ['relationship_app.backends.ProfileModelBackend']
+
 MIDDLEWARE = [
+    'LibraryProject.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -148,8 +154,61 @@ LOGIN_URL = 'relationship/login/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Profile photo thumbnails, generated in the background after upload
+# (see LibraryProject/thumbnails.py)
+THUMBNAIL_SIZES = {'small': 48, 'medium': 128, 'large': 256}
+THUMBNAIL_WORKERS = 2
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Per-request SQL instrumentation (see LibraryProject/middleware.py):
+# query count and DB time in the Server-Timing header and the log
+QUERY_INSTRUMENTATION = DEBUG
+
+# Raise instead of logging a warning when a view exceeds its query budget
+QUERY_BUDGET_STRICT = 'test' in sys.argv
+
+# The default cache holds the permission snapshots and the version tokens
+# that invalidate cached data, so every process of the site must share it:
+# a per-process (local memory) cache would keep serving revoked
+# permissions in the other processes. Set CACHE_URL to a Redis
+# (redis://host:6379/0) or Memcached (memcached://host:11211) server to
+# share it between hosts. Without it, the cache is a directory of the
+# project, shared by the processes of this host; not the system temporary
+# directory, where anyone could plant entries (pickles) the cache would
+# load.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+elif CACHE_URL.startswith('memcached://'):
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL.removeprefix('memcached://'),
+    }
+else:
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        # Created readable by the owner only
+        'LOCATION': BASE_DIR / 'cache',
+    }
+
+CACHES = {
+    'default': DEFAULT_CACHE,
+    # Ranked result ids of bookshelf searches (see bookshelf/search.py).
+    # Local memory caches evict the least recently used entries once
+    # MAX_ENTRIES is reached.
+    'bookshelf_search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bookshelf-search',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+BOOKSHELF_SEARCH_CACHE = 'bookshelf_search'
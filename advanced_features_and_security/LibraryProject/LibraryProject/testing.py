@@ -0,0 +1,36 @@
+"""
+Helpers shared by the test suites of the apps.
+
+Tests clear the caches and replace version tokens, so they must not use the
+caches of the site. Decorate test cases with isolated_caches to give them
+caches of their own:
+
+- default: a file cache in a private temporary directory, removed at exit.
+  Like the site's, it is shared by every connection to it, so that a
+  connection made with caches.create_connection() stands for another
+  process.
+- bookshelf_search: a separate local memory cache.
+"""
+import atexit
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+TEST_CACHE_DIR = tempfile.mkdtemp(prefix='libraryproject-test-cache-')
+atexit.register(shutil.rmtree, TEST_CACHE_DIR, ignore_errors=True)
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEST_CACHE_DIR,
+    },
+    'bookshelf_search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bookshelf-search-test',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+isolated_caches = override_settings(CACHES=TEST_CACHES)
@@ -0,0 +1,122 @@
+"""
+Background thumbnails for uploaded images.
+
+After an image is uploaded, schedule_thumbnails() queues the generation of
+one square, re-encoded JPEG per size in THUMBNAIL_SIZES on a thread pool,
+once the transaction commits. The request that saved the upload doesn't
+wait for it, and no broker or worker process is needed. Thumbnails are
+stored next to the original with the size in the name:
+
+    profile_photos/me.png -> thumbnails/profile_photos/me_128.jpg
+
+Uploads get a new name from the storage, so a missing thumbnail means it
+wasn't generated yet; templates fall back to the original until it is
+(see the thumbnail_url template tag).
+
+Settings:
+
+- THUMBNAIL_SIZES: {name: pixels} (default: small 48, medium 128, large 256)
+- THUMBNAIL_QUALITY: JPEG quality (default: 85)
+- THUMBNAIL_WORKERS: threads in the pool (default: 2)
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {'small': 48, 'medium': 128, 'large': 256}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def get_sizes():
+    """{name: pixels}, smallest first."""
+    sizes = getattr(settings, 'THUMBNAIL_SIZES', DEFAULT_SIZES)
+    return dict(sorted(sizes.items(), key=lambda item: item[1]))
+
+
+def thumbnail_name(name, pixels):
+    root, _ = os.path.splitext(name)
+    return f'thumbnails/{root}_{pixels}.jpg'
+
+
+def has_thumbnails(field_file):
+    """True when the largest thumbnail of the file (written last) exists."""
+    largest = max(get_sizes().values())
+    return field_file.storage.exists(thumbnail_name(field_file.name, largest))
+
+
+def generate_thumbnails(storage, name):
+    """Write the thumbnails of the image `name` in `storage`; returns their names."""
+    from PIL import Image, ImageOps
+
+    sizes = sorted(get_sizes().values())
+    quality = getattr(settings, 'THUMBNAIL_QUALITY', 85)
+    written = []
+    with storage.open(name, 'rb') as original:
+        with Image.open(original) as image:
+            # Lets JPEG decode at a fraction of the full resolution
+            image.draft('RGB', (sizes[-1], sizes[-1]))
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                # Transparent areas become white
+                rgba = image.convert('RGBA')
+                image = Image.new('RGB', rgba.size, 'white')
+                image.paste(rgba, mask=rgba.getchannel('A'))
+            for pixels in sizes:
+                thumbnail = ImageOps.fit(image, (pixels, pixels), Image.LANCZOS)
+                buffer = BytesIO()
+                thumbnail.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+                target = thumbnail_name(name, pixels)
+                if storage.exists(target):
+                    storage.delete(target)
+                written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _run(storage, name):
+    try:
+        generate_thumbnails(storage, name)
+    except Exception:
+        # Not an image Pillow can read, or a storage error: keep serving
+        # the original
+        logger.exception('Could not generate the thumbnails of %s', name)
+
+
+def schedule_thumbnails(field_file):
+    """Generate the thumbnails of `field_file` in the background after commit."""
+    if not field_file or has_thumbnails(field_file):
+        return
+    storage, name = field_file.storage, field_file.name
+
+    def submit():
+        future = get_executor().submit(_run, storage, name)
+        _pending.add(future)
+        future.add_done_callback(_pending.discard)
+
+    transaction.on_commit(submit)
+
+
+def wait_for_thumbnails(timeout=None):
+    """Block until the queued thumbnails are written (tests, management commands)."""
+    wait(list(_pending), timeout=timeout)
@@ -22,6 +22,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('relationship/', include('relationship_app.urls')),
+    path('bookshelf/', include('bookshelf.urls')),
 ]
 
 if settings.DEBUG:
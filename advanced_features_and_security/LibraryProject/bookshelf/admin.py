@@ -1,14 +1,15 @@
 from django.contrib import admin
 from .models import Book, CustomUser, CustomUserManager
 from django.contrib.auth.admin import UserAdmin
+from LibraryProject.admin_mixins import ChangeListPerformanceMixin
 
 # Register your models here.
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(ChangeListPerformanceMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'publication_year')
     list_filter = ("author"),
     search_fields = ('title', 'author')
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ChangeListPerformanceMixin, UserAdmin):
     
     model = CustomUser
     
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from bookshelf.models import CustomUser
+from LibraryProject.thumbnails import generate_thumbnails, has_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate the missing thumbnails of profile photos, e.g. for photos uploaded before thumbnails existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate existing thumbnails too (e.g. after changing THUMBNAIL_SIZES)')
+
+    def handle(self, *args, **options):
+        count = 0
+        for user in CustomUser.objects.exclude(profile_photo='').exclude(profile_photo=None).iterator():
+            photo = user.profile_photo
+            if options['force'] or not has_thumbnails(photo):
+                try:
+                    generate_thumbnails(photo.storage, photo.name)
+                except OSError as error:
+                    self.stderr.write(f'{photo.name}: {error}')
+                    continue
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {count} profile photos.'))
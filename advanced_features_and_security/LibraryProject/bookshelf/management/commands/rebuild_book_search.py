@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bookshelf.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the book search tokens, e.g. after bulk writes that bypass the model signals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Books indexed per INSERT (default: 1000)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} books.'))
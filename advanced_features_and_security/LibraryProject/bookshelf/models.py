@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, UserManager as DefaultUserManager
 from django.contrib.auth.models import BaseUserManager
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from LibraryProject.thumbnails import schedule_thumbnails
 
 # Create your models here.
 class Book(models.Model):
@@ -19,6 +23,52 @@ class Book(models.Model):
     #string representation
     def __str__(self):
         return (f"ID:{self.id}: {self.title}, {self.author}, {self.publication_year}")
+
+
+class BookSearchToken(models.Model):
+    """One normalized word of a book's title or author, see search.py."""
+    TITLE = 'title'
+    AUTHOR = 'author'
+    FIELD_CHOICES = [
+        (TITLE, 'Title'),
+        (AUTHOR, 'Author'),
+    ]
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='search_tokens')
+    field = models.CharField(max_length=10, choices=FIELD_CHOICES)
+    token = models.CharField(max_length=50)
+
+    class Meta:
+        indexes = [
+            # Prefix lookups (token >= 'orw' AND token < 'orw\uffff') are
+            # range scans on this index, see search.py
+            models.Index(fields=['token', 'field', 'book'], name='bookshelf_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.field}:{self.token}"
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, created, raw, **kwargs):
+    """Keep the search tokens in step with the book; deletes cascade."""
+    if raw:
+        return
+    from .search import index_books
+    index_books([instance], created=created)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_search(sender, **kwargs):
+    """
+    Cached search results may include, or miss, the changed book. Wait for
+    the commit: a search run before it would cache the old results under
+    the new version.
+    """
+    from .search import invalidate_search_cache
+    transaction.on_commit(invalidate_search_cache)
+
     
 class CustomUserManager(BaseUserManager):
        
@@ -51,4 +101,15 @@ class CustomUser(AbstractUser):
     objects = CustomUserManager()
     
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+
+@receiver(post_save, sender=CustomUser)
+def generate_profile_photo_thumbnails(sender, instance, update_fields, raw, **kwargs):
+    """
+    Thumbnail a new profile photo in the background (see thumbnails.py).
+    Saves of other fields, like the last_login update, are skipped.
+    """
+    if raw or (update_fields is not None and 'profile_photo' not in update_fields):
+        return
+    schedule_thumbnails(instance.profile_photo)
\ No newline at end of file
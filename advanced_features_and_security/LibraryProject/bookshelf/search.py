@@ -0,0 +1,233 @@
+"""
+Token index for searching books.
+
+Every Book has one BookSearchToken row per distinct normalized word of its
+title and author. Normalizing lowercases the text, strips accents and
+splits it on anything that isn't a letter or a digit, so "Orwell, George"
+gives the tokens "orwell" and "george".
+
+A search term matches a token it is a prefix of ("orw" finds "orwell").
+The prefix is looked up as the range token >= 'orw' AND token < 'orw\uffff'
+so that it is a range scan of bookshelf_token_idx on every database;
+startswith would compile to LIKE ... ESCAPE (SQLite) or LIKE BINARY
+(MySQL), which can't use the index, and be no better than the
+LIKE '%term%' table scan of icontains. All terms must match, and only the
+first MAX_TERMS are used (ignored_terms() tells which were dropped).
+A query that has text but no words, such as "!!!", matches nothing.
+Results are ranked by relevance:
+
+- a title word counts more than an author word
+- a whole-word match counts more than a prefix match
+
+and capped at MAX_RESULTS. search_book_ids() runs a single GROUP BY query
+on the token table and returns the ranked book ids; load_books() turns
+them into Book instances in the same order.
+
+The tokens are kept up to date by the receivers in models.py. Writes that
+don't send signals (QuerySet.update(), bulk_create()) need a
+`manage.py rebuild_book_search`.
+
+cached_search_book_ids() caches the id lists in the cache named by the
+BOOKSHELF_SEARCH_CACHE setting, keyed on the normalized terms (so
+"Orwell" and " orwell," share an entry) and a version token replaced
+when a Book write commits. The token lives in the default cache, shared by every
+process, so the per-process result cache can't serve results older than
+the last write. Expiry and least-recently-used eviction are the cache
+backend's TIMEOUT and MAX_ENTRIES. Only ids are cached, never books or
+rendered pages: the views still check can_view before searching and load
+the current rows with in_bulk().
+"""
+import hashlib
+import json
+import re
+import unicodedata
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
+
+from .models import Book, BookSearchToken
+
+MAX_RESULTS = 200
+MAX_TOKEN_LENGTH = 50
+MAX_TERMS = 8
+
+TITLE_WEIGHT = 4
+AUTHOR_WEIGHT = 2
+EXACT_BONUS = 1
+
+WORD_RE = re.compile(r'\w+')
+
+# Sorts after every character a token can contain after the prefix
+PREFIX_END = '\uffff'
+
+VERSION_KEY = 'bookshelf:search_version'
+RESULTS_KEY = 'bookshelf:search:{}:{}'
+
+
+def normalize(text):
+    """Lowercase `text` and strip its accents: 'Émile' -> 'emile'."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return text.casefold()
+
+
+def tokenize(text):
+    """Distinct normalized words of `text`, in order of appearance."""
+    words = (word[:MAX_TOKEN_LENGTH] for word in WORD_RE.findall(normalize(text)))
+    return list(dict.fromkeys(words))
+
+
+def book_tokens(book):
+    """BookSearchToken instances (unsaved) for `book`."""
+    return [
+        BookSearchToken(book_id=book.pk, field=field, token=token)
+        for field in (BookSearchToken.TITLE, BookSearchToken.AUTHOR)
+        for token in tokenize(getattr(book, field))
+    ]
+
+
+def index_books(books, created=False):
+    """
+    Replace the tokens of `books`. Pass created=True for new books to skip
+    deleting their (nonexistent) old tokens.
+    """
+    books = list(books)
+    if not books:
+        return
+    if not created:
+        BookSearchToken.objects.filter(book__in=[book.pk for book in books]).delete()
+    BookSearchToken.objects.bulk_create([token for book in books for token in book_tokens(book)])
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the tokens of every book; returns the number of books indexed."""
+    BookSearchToken.objects.all().delete()
+    count, batch = 0, []
+    for book in Book.objects.only('pk', 'title', 'author').iterator(chunk_size=batch_size):
+        batch.append(book)
+        if len(batch) == batch_size:
+            index_books(batch, created=True)
+            count, batch = count + len(batch), []
+    index_books(batch, created=True)
+    transaction.on_commit(invalidate_search_cache)
+    return count + len(batch)
+
+
+def search_terms(query='', title='', author=''):
+    """(term, fields) pairs of a search, in order, before MAX_TERMS applies."""
+    terms = [(term, (BookSearchToken.TITLE, BookSearchToken.AUTHOR)) for term in tokenize(query)]
+    terms += [(term, (BookSearchToken.TITLE,)) for term in tokenize(title)]
+    terms += [(term, (BookSearchToken.AUTHOR,)) for term in tokenize(author)]
+    return terms
+
+
+def ignored_terms(query='', title='', author=''):
+    """The terms of a search beyond MAX_TERMS, which searching ignores."""
+    return [term for term, fields in search_terms(query, title, author)[MAX_TERMS:]]
+
+
+def _has_text(*values):
+    return any(value and value.strip() for value in values)
+
+
+def _prefix_q(term):
+    # A range rather than token__startswith, see the module docstring
+    return Q(token__gte=term, token__lt=term + PREFIX_END)
+
+
+def _term_score(term, fields):
+    """Best score of `term` among the tokens of a book (0 when it doesn't match)."""
+    weights = {BookSearchToken.TITLE: TITLE_WEIGHT, BookSearchToken.AUTHOR: AUTHOR_WEIGHT}
+    whens = []
+    for field in fields:
+        whens.append(When(field=field, token=term, then=Value(weights[field] + EXACT_BONUS)))
+        whens.append(When(_prefix_q(term), field=field, then=Value(weights[field])))
+    return Max(Case(*whens, default=Value(0), output_field=IntegerField()))
+
+
+def search_book_ids(query='', title='', author='', publication_year=None, limit=MAX_RESULTS):
+    """
+    Ids of the books matching every term, most relevant first.
+
+    `query` terms match title or author words, `title` and `author` terms
+    only words of that field. With no search text at all, returns None:
+    there is nothing to rank and the caller should use a plain queryset.
+    Text without any words returns an empty list.
+    """
+    if not _has_text(query, title, author):
+        return None
+    terms = search_terms(query, title, author)[:MAX_TERMS]
+    if not terms:
+        return []
+    rows = ranked_rows(terms, publication_year)
+    return list(rows.values_list('book_id', flat=True)[:limit])
+
+
+def ranked_rows(terms, publication_year=None):
+    """The GROUP BY query on the token table behind search_book_ids()."""
+    # Only read the token rows matching some term, through the token index
+    candidates = Q()
+    for term, fields in terms:
+        candidates |= _prefix_q(term) & Q(field__in=fields)
+    tokens = BookSearchToken.objects.filter(candidates)
+    if publication_year is not None:
+        tokens = tokens.filter(book__publication_year=publication_year)
+
+    scores = {f'score_{i}': _term_score(term, fields) for i, (term, fields) in enumerate(terms)}
+    return (
+        tokens.values('book_id')
+        .annotate(**scores)
+        # Every term must match (HAVING score_N > 0)
+        .filter(**{f'{name}__gt': 0 for name in scores})
+        .annotate(rank=sum((F(name) for name in scores), Value(0)))
+        .order_by('-rank', 'book_id')
+    )
+
+
+def load_books(book_ids):
+    """Books with the given ids, in the order of `book_ids`."""
+    books = Book.objects.in_bulk(book_ids)
+    return [books[book_id] for book_id in book_ids if book_id in books]
+
+
+def get_search_cache():
+    return caches[getattr(settings, 'BOOKSHELF_SEARCH_CACHE', 'default')]
+
+
+def get_search_version():
+    """
+    Token replaced on every Book write, part of the result cache keys. It is
+    kept in the default cache, shared by every process, so that a write
+    invalidates the results cached by all of them.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate_search_cache(sender=None, **kwargs):
+    cache.delete(VERSION_KEY)
+
+
+def cached_search_book_ids(query='', title='', author='', publication_year=None):
+    """search_book_ids(), cached until a book changes or the entry expires."""
+    if not _has_text(query, title, author):
+        return None
+    terms = [tokenize(query), tokenize(title), tokenize(author), publication_year]
+    if not any(terms[:3]):
+        return []
+    digest = hashlib.md5(json.dumps(terms).encode()).hexdigest()
+    key = RESULTS_KEY.format(get_search_version(), digest)
+
+    results = get_search_cache()
+    book_ids = results.get(key)
+    if book_ids is None:
+        book_ids = search_book_ids(query, title, author, publication_year)
+        results.set(key, book_ids)
+    return book_ids
@@ -1,3 +1,416 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import reverse
+from PIL import Image
+
+from LibraryProject.testing import isolated_caches
+from LibraryProject.thumbnails import thumbnail_name, wait_for_thumbnails
+from relationship_app.permissions import VERSION_KEY
+
+from .models import Book, BookSearchToken
+from .search import VERSION_KEY as SEARCH_VERSION_KEY, MAX_RESULTS, cached_search_book_ids, get_search_cache
+from .search import MAX_TERMS, index_books, ranked_rows, search_book_ids, search_terms, tokenize
+
+
+def bookshelf_permission(codename):
+    return Permission.objects.get(content_type__app_label='bookshelf', codename=codename)
+
+
+@isolated_caches
+class BookSearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.animal_farm = Book.objects.create(title='Animal Farm', author='George Orwell', publication_year=1945)
+        cls.nineteen = Book.objects.create(title='Nineteen Eighty-Four', author='George Orwell', publication_year=1949)
+        cls.emile = Book.objects.create(title='Émile', author='Jean-Jacques Rousseau', publication_year=1762)
+        cls.orwell = Book.objects.create(title='Orwell and the Left', author='Alex Zwerdling', publication_year=1974)
+
+        cls.user = get_user_model().objects.create_user('reader', 'reader@example.com', 'pass')
+        cls.user.user_permissions.add(bookshelf_permission('can_view'))
+
+    def setUp(self):
+        # Cached results don't roll back with the test transactions
+        cache.clear()
+        get_search_cache().clear()
+        self.client.force_login(self.user)
+
+    def get(self, name, data):
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        return self.client.get(reverse(name), data, secure=True)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Nineteen Eighty-Four'), ['nineteen', 'eighty', 'four'])
+        self.assertEqual(tokenize('ÉMILE, émile'), ['emile'])
+        self.assertEqual(tokenize('  '), [])
+
+    def test_tokens_follow_saves_and_deletes(self):
+        self.assertEqual(
+            set(self.animal_farm.search_tokens.values_list('field', 'token')),
+            {('title', 'animal'), ('title', 'farm'), ('author', 'george'), ('author', 'orwell')},
+        )
+        self.animal_farm.title = 'Burmese Days'
+        self.animal_farm.save()
+        self.assertEqual(search_book_ids('animal'), [])
+        self.assertEqual(search_book_ids('burm'), [self.animal_farm.pk])
+
+        pk = self.animal_farm.pk
+        self.animal_farm.delete()
+        self.assertFalse(BookSearchToken.objects.filter(book_id=pk).exists())
+
+    def test_prefix_terms_must_all_match(self):
+        self.assertEqual(search_book_ids('orw farm'), [self.animal_farm.pk])
+        self.assertEqual(search_book_ids('emi'), [self.emile.pk])
+        self.assertEqual(search_book_ids('ORWELL zzz'), [])
+        # Only word prefixes match, not substrings
+        self.assertEqual(search_book_ids('well'), [])
+        self.assertIsNone(search_book_ids('   '))
+        # Text without words matches nothing rather than every book
+        self.assertEqual(search_book_ids('  --  '), [])
+        self.assertEqual(cached_search_book_ids('!!!'), [])
+
+    def test_prefixes_are_index_range_scans(self):
+        plan = ranked_rows(search_terms('orw farm')).explain()
+        self.assertIn('bookshelf_token_idx', plan)
+        self.assertNotIn('LIKE', str(ranked_rows(search_terms('orw')).query))
+
+    def test_ranking(self):
+        # A title match ranks above author matches, then by id
+        self.assertEqual(
+            search_book_ids('orwell'),
+            [self.orwell.pk, self.animal_farm.pk, self.nineteen.pk],
+        )
+
+    def test_field_terms_and_year(self):
+        self.assertEqual(search_book_ids(title='orwell'), [self.orwell.pk])
+        self.assertEqual(search_book_ids(author='orwell', publication_year=1949), [self.nineteen.pk])
+
+    def test_results_are_capped(self):
+        Book.objects.bulk_create(
+            [Book(title=f'Dune {i}', author='Frank Herbert', publication_year=1965) for i in range(MAX_RESULTS + 10)]
+        )
+        call_command('rebuild_book_search', stdout=StringIO())
+        self.assertEqual(len(search_book_ids('dune')), MAX_RESULTS)
+        self.assertEqual(len(search_book_ids('dune', limit=5)), 5)
+
+    def test_rebuild_command(self):
+        BookSearchToken.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_book_search', stdout=out)
+        self.assertIn('Indexed 4 books.', out.getvalue())
+        self.assertEqual(search_book_ids('rousseau'), [self.emile.pk])
+
+    def test_book_list_search(self):
+        response = self.get('book_list', {'search': 'orwell'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['books'], [self.orwell, self.animal_farm, self.nineteen])
+
+        response = self.get('book_list', {})
+        self.assertEqual(len(response.context['books']), 4)
+
+    def test_book_list_search_without_words(self):
+        response = self.get('book_list', {'search': '!!!'})
+        self.assertEqual(response.context['books'], [])
+
+    def test_ignored_terms_are_reported(self):
+        # The first MAX_TERMS terms all match Nineteen Eighty-Four
+        terms = ['nineteen'[:length] for length in range(1, MAX_TERMS + 1)]
+        response = self.get('book_list', {'search': ' '.join(terms + ['zzz'])})
+        self.assertEqual(response.context['books'], [self.nineteen])
+        self.assertEqual(
+            [str(message) for message in response.context['messages']],
+            [f'Only the first {MAX_TERMS} search terms were used; ignored: zzz.'],
+        )
+
+        response = self.get('advanced_book_search', {'title': ' '.join(terms), 'author': 'george'})
+        self.assertEqual(response.context['books'], [self.nineteen])
+        self.assertContains(response, 'ignored: george.')
+
+    def test_advanced_search(self):
+        response = self.get('advanced_book_search', {'author': 'george', 'year': '1945'})
+        self.assertEqual(response.context['books'], [self.animal_farm])
+
+        response = self.get('advanced_book_search', {'year': '1762'})
+        self.assertEqual(list(response.context['books']), [self.emile])
+
+    def test_search_requires_can_view(self):
+        user = get_user_model().objects.create_user('guest', 'guest@example.com', 'pass')
+        self.client.force_login(user)
+        response = self.get('book_list', {'search': 'orwell'})
+        self.assertEqual(response.status_code, 403)
+
+
+@isolated_caches
+class SearchCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.animal_farm = Book.objects.create(title='Animal Farm', author='George Orwell', publication_year=1945)
+        cls.user = get_user_model().objects.create_user('reader', 'reader@example.com', 'pass')
+        cls.user.user_permissions.add(bookshelf_permission('can_view'))
+
+    def setUp(self):
+        cache.clear()
+        get_search_cache().clear()
+
+    def assertCached(self, **terms):
+        with CaptureQueriesContext(connection) as context:
+            book_ids = cached_search_book_ids(**terms)
+        self.assertEqual(len(context.captured_queries), 0)
+        return book_ids
+
+    def test_normalized_terms_share_an_entry(self):
+        self.assertEqual(cached_search_book_ids('Orwell'), [self.animal_farm.pk])
+        self.assertEqual(self.assertCached(query=' ORWELL, '), [self.animal_farm.pk])
+        # Different fields are different searches
+        self.assertEqual(cached_search_book_ids(title='orwell'), [])
+
+    def test_book_writes_invalidate(self):
+        cached_search_book_ids('dune')
+        self.assertEqual(self.assertCached(query='dune'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dune = Book.objects.create(title='Dune', author='Frank Herbert', publication_year=1965)
+        self.assertEqual(cached_search_book_ids('dune'), [dune.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dune.delete()
+        self.assertEqual(cached_search_book_ids('dune'), [])
+
+    def test_invalidation_waits_for_commit(self):
+        cached_search_book_ids('dune')
+        version = cache.get(SEARCH_VERSION_KEY)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Book.objects.create(title='Dune', author='Frank Herbert', publication_year=1965)
+        # A search before the commit would cache the old results under a
+        # new version
+        self.assertEqual(cache.get(SEARCH_VERSION_KEY), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(SEARCH_VERSION_KEY))
+
+    def test_writes_from_other_processes_invalidate(self):
+        self.assertEqual(cached_search_book_ids('dune'), [])
+
+        # Another process writes the book and replaces the version token in
+        # the default cache, which it shares with this one
+        dune = Book.objects.bulk_create([Book(title='Dune', author='Frank Herbert', publication_year=1965)])
+        index_books(dune, created=True)
+        caches.create_connection('default').delete(SEARCH_VERSION_KEY)
+        self.assertEqual(cached_search_book_ids('dune'), [dune[0].pk])
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'bookshelf_search': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bookshelf-search-lru',
+            'OPTIONS': {'MAX_ENTRIES': 3},
+        },
+    })
+    def test_least_recently_used_entries_are_evicted(self):
+        cached_search_book_ids('animal')
+        cached_search_book_ids('farm')
+        cached_search_book_ids('george')
+        # Touch 'animal' so that 'farm' is the least recently used entry
+        self.assertCached(query='animal')
+        cached_search_book_ids('orwell')
+
+        self.assertCached(query='animal')
+        with CaptureQueriesContext(connection) as context:
+            cached_search_book_ids('farm')
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_cached_search_still_checks_can_view(self):
+        cached_search_book_ids('orwell')
+        guest = get_user_model().objects.create_user('guest', 'guest@example.com', 'pass')
+        self.client.force_login(guest)
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        response = self.client.get(reverse('book_list'), {'search': 'orwell'}, secure=True)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('book_list'), {'search': 'orwell'}, secure=True)
+        self.assertEqual(response.context['books'], [self.animal_farm])
+
+
+@isolated_caches
+class PermissionSnapshotTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editors = Group.objects.create(name='Editors')
+        cls.editors.permissions.add(bookshelf_permission('can_view'), bookshelf_permission('can_edit'))
+        cls.user = get_user_model().objects.create_user('editor', 'editor@example.com', 'pass')
+        cls.user.groups.add(cls.editors)
+        cls.user.user_permissions.add(bookshelf_permission('can_delete'))
+        Book.objects.create(title='Animal Farm', author='George Orwell', publication_year=1945)
+
+    def setUp(self):
+        # Snapshots don't roll back with the test transactions
+        cache.clear()
+
+    def fresh_user(self):
+        """The user as a new request loads it, without per-request caches."""
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_checks_run_no_query_after_warm_up(self):
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_view'))
+
+        user = self.fresh_user()
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(user.has_perm('bookshelf.can_edit'))
+            self.assertTrue(user.has_perm('bookshelf.can_delete'))
+            self.assertFalse(user.has_perm('bookshelf.can_create'))
+            self.assertTrue(user.has_module_perms('bookshelf'))
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_views_and_templates_run_no_permission_query_after_warm_up(self):
+        self.client.force_login(self.user)
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        self.client.get(reverse('book_list'), secure=True)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('book_list'), secure=True)
+        self.assertContains(response, 'Edit</a>')
+        self.assertContains(response, 'Delete</a>')
+        self.assertNotContains(response, 'Add New Book')
+        tables = ['auth_permission', 'auth_group', 'user_permissions', 'django_content_type']
+        for query in context.captured_queries:
+            for table in tables:
+                self.assertNotIn(table, query['sql'])
+
+    def commit(self):
+        """Run the on_commit callbacks of the changes made in the block."""
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def test_snapshots_are_shared_between_processes(self):
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_delete'))
+
+        # Another process, with its own connection to the default cache,
+        # revokes the permission; this one must stop granting it
+        other_process = caches.create_connection('default')
+        self.user.user_permissions.remove(bookshelf_permission('can_delete'))
+        other_process.delete(VERSION_KEY)
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_delete'))
+
+    def test_invalidation_waits_for_commit(self):
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_delete'))
+        version = cache.get(VERSION_KEY)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.user_permissions.remove(bookshelf_permission('can_delete'))
+        # A request reading the old grants before the commit must not cache
+        # them under a new version
+        self.assertEqual(cache.get(VERSION_KEY), version)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.assertIsNone(cache.get(VERSION_KEY))
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_delete'))
+
+    def test_group_permission_changes_invalidate(self):
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_edit'))
+        with self.commit():
+            self.editors.permissions.remove(bookshelf_permission('can_edit'))
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_edit'))
+
+        with self.commit():
+            self.editors.permissions.add(bookshelf_permission('can_create'))
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_create'))
+
+        with self.commit():
+            self.editors.delete()
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_view'))
+
+    def test_user_grant_changes_invalidate(self):
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_view'))
+        with self.commit():
+            self.user.groups.clear()
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_view'))
+
+        with self.commit():
+            self.user.groups.add(self.editors)
+        self.assertTrue(self.fresh_user().has_perm('bookshelf.can_view'))
+
+        with self.commit():
+            self.user.user_permissions.remove(bookshelf_permission('can_delete'))
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_delete'))
+
+    def test_superuser_and_inactive_users(self):
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_create'))
+        get_user_model().objects.filter(pk=self.user.pk).update(is_superuser=True)
+        user = self.fresh_user()
+        self.assertTrue(user.has_perm('bookshelf.can_create'))
+        self.assertIn('bookshelf.can_create', user.get_all_permissions())
+
+        get_user_model().objects.filter(pk=self.user.pk).update(is_superuser=False, is_active=False)
+        self.assertFalse(self.fresh_user().has_perm('bookshelf.can_view'))
+
+
+def make_image(width=1600, height=1200):
+    """An upload of random pixels, which compress badly, like a photo."""
+    image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@isolated_caches
+class ProfilePhotoThumbnailTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_user(self):
+        return get_user_model().objects.create_user(
+            'reader', 'reader@example.com', 'pass', profile_photo=make_image(),
+        )
+
+    def test_thumbnails_are_generated_in_the_background(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            user = self.create_user()
+        photo = user.profile_photo
+        self.assertFalse(photo.storage.exists(thumbnail_name(photo.name, 48)))
+
+        callbacks[0]()
+        wait_for_thumbnails(timeout=30)
+        for pixels in [48, 128, 256]:
+            name = thumbnail_name(photo.name, pixels)
+            with photo.storage.open(name) as file, Image.open(file) as thumbnail:
+                self.assertEqual(thumbnail.size, (pixels, pixels))
+            self.assertLess(photo.storage.size(name) * 10, photo.size)
+
+        html = Template('{% load thumbnails %}{% thumbnail_url photo 40 %}').render(Context({'photo': photo}))
+        self.assertTrue(html.endswith('_48.jpg'))
+        # Unknown size names fall back to the original
+        html = Template('{% load thumbnails %}{% thumbnail_url photo "huge" %}').render(Context({'photo': photo}))
+        self.assertEqual(html, photo.url)
+
+    def test_logins_dont_regenerate(self):
+        with self.captureOnCommitCallbacks():
+            user = self.create_user()
+        with self.captureOnCommitCallbacks() as callbacks:
+            # What django.contrib.auth does on login
+            user.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+    def test_generate_thumbnails_command(self):
+        with self.captureOnCommitCallbacks():
+            user = self.create_user()
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('Generated thumbnails for 1 profile photos.', out.getvalue())
+        self.assertTrue(user.profile_photo.storage.exists(thumbnail_name(user.profile_photo.name, 256)))
@@ -1,15 +1,26 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.http import HttpResponseForbidden
-from django.db.models import Q
 from .models import Book
 from .forms import BookForm
+from .search import MAX_TERMS, cached_search_book_ids, ignored_terms, load_books
 from .forms import ExampleForm  
 
 # ============================================================================
 # SECURITY BEST PRACTICES IN VIEWS
 # ============================================================================
 
+def warn_ignored_terms(request, **search):
+    """Tell the user which search terms beyond MAX_TERMS were not used."""
+    ignored = ignored_terms(**search)
+    if ignored:
+        messages.warning(
+            request,
+            f'Only the first {MAX_TERMS} search terms were used; ignored: {", ".join(ignored)}.',
+        )
+
+
 # View to list all books with search functionality
 @login_required
 @permission_required('bookshelf.can_view', raise_exception=True)
@@ -21,19 +32,23 @@ def book_list(request):
     - Uses Django ORM to prevent SQL injection
     - Validates and sanitizes search input through Django's query methods
     - User input is never directly interpolated into SQL queries
+
+    Searches go through the token index (search.py) instead of icontains
+    LIKE scans; results are ranked by relevance and capped. The ranked ids
+    are cached and loaded with in_bulk() after the permission check, so a
+    cached search never bypasses can_view.
     """
     books = Book.objects.all()
     
     # SECURE: Handle search query safely using Django ORM
     search_query = request.GET.get('search', '')
     
-    if search_query:
-        # SAFE: Using Django ORM's filter with Q objects
-        # This is parameterized and prevents SQL injection
-        books = books.filter(
-            Q(title__icontains=search_query) |
-            Q(author__icontains=search_query)
-        )
+    book_ids = cached_search_book_ids(search_query)
+    warn_ignored_terms(request, query=search_query)
+    if book_ids is not None:
+        # SAFE: The search terms are normalized to plain words and only
+        # ever passed to the ORM as query parameters
+        books = load_books(book_ids)
         
         # UNSAFE EXAMPLE - NEVER DO THIS:
         # from django.db import connection
@@ -154,22 +169,24 @@ def advanced_book_search(request):
     author = request.GET.get('author', '').strip()
     year = request.GET.get('year', '').strip()
     
-    # Build query safely using Django ORM
-    if title:
-        books = books.filter(title__icontains=title)
-    
-    if author:
-        books = books.filter(author__icontains=author)
-    
+    year_int = None
     if year:
         # SAFE: Validate year is numeric before filtering
         try:
             year_int = int(year)
-            books = books.filter(publication_year=year_int)
         except ValueError:
             # Invalid year input - ignore or show error
             pass
     
+    # Title and author terms are matched against the token index of their
+    # own field, ranked and capped like book_list
+    book_ids = cached_search_book_ids(title=title, author=author, publication_year=year_int)
+    warn_ignored_terms(request, title=title, author=author)
+    if book_ids is not None:
+        books = load_books(book_ids)
+    elif year_int is not None:
+        books = books.filter(publication_year=year_int)
+    
     return render(request, 'bookshelf/book_list.html', {
         'books': books
     })
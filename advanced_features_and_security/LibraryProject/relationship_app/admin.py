@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from LibraryProject.admin_mixins import ChangeListPerformanceMixin
 from .models import CustomUser, Author, Book, Library, Librarian, UserProfile
 
 
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ChangeListPerformanceMixin, UserAdmin):
     
     model = CustomUser
     
@@ -59,33 +62,89 @@ admin.site.register(CustomUser, CustomUserAdmin)
 
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(ChangeListPerformanceMixin, admin.ModelAdmin):
     list_display = ['name']
     search_fields = ['name']
 
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(ChangeListPerformanceMixin, admin.ModelAdmin):
     list_display = ['title', 'author']
     list_filter = ['author']
     search_fields = ['title', 'author__name']
+    # The autocomplete widgets (library membership) match title or author
+    # name prefixes, which can use the indexes on both columns
+    autocomplete_search_fields = ['^title', '^author__name']
+
+    def get_search_fields(self, request):
+        if getattr(request.resolver_match, 'url_name', None) == 'autocomplete':
+            return self.autocomplete_search_fields
+        return super().get_search_fields(request)
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset showing one page of the related rows.
+
+    Only the rows of the current page are rendered and validated, and every
+    form saves, adds or deletes its own row, so editing a membership never
+    touches the other rows. The page comes from ?<prefix>-page=.
+    """
+    per_page = 50
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, '_page_queryset'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+            self._page_queryset = self.page.object_list
+        return self._page_queryset
+
+
+class LibraryBookInline(admin.TabularInline):
+    """
+    The books of a library as rows of the Library.books through table.
+
+    Replaces filter_horizontal, which renders every book in the catalog
+    into the page: books are picked with an autocomplete widget and the
+    current books are paginated.
+    """
+    model = Library.books.through
+    formset = PaginatedInlineFormSet
+    autocomplete_fields = ['book']
+    extra = 1
+    per_page = 50
+    verbose_name = 'book'
+    verbose_name_plural = 'books'
+    template = 'admin/relationship_app/library/paginated_tabular.html'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('book__author').order_by('book__title', 'pk')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_number = request.GET.get(f'{formset.get_default_prefix()}-page', 1)
+        return formset
 
 
 @admin.register(Library)
 class LibraryAdmin(admin.ModelAdmin):
     list_display = ['name']
     search_fields = ['name']
-    filter_horizontal = ['books'] 
+    # Memberships are edited row by row in LibraryBookInline
+    exclude = ['books']
+    inlines = [LibraryBookInline]
 
 
 @admin.register(Librarian)
-class LibrarianAdmin(admin.ModelAdmin):
+class LibrarianAdmin(ChangeListPerformanceMixin, admin.ModelAdmin):
     list_display = ['name', 'library']
     search_fields = ['name', 'library__name']
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(ChangeListPerformanceMixin, admin.ModelAdmin):
     list_display = ['user', 'role']
     list_filter = ['role']
     search_fields = ['user__username']
\ No newline at end of file
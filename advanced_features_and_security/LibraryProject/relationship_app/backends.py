@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .permissions import get_permission_snapshot
+
+UserModel = get_user_model()
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the user's UserProfile in the same query.
+
+    AuthenticationMiddleware gets request.user from get_user(), so with the
+    profile joined in, the role checks in views.py (is_admin, is_librarian,
+    is_member) never run a query of their own. Users without a profile are
+    cached as such too: the LEFT OUTER JOIN tells there is none.
+
+    Permissions come from the cached snapshot in permissions.py, so
+    has_perm() checks run no query once it is warm.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('userprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = get_permission_snapshot(user_obj)
+        return user_obj._perm_cache
@@ -0,0 +1,61 @@
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from relationship_app.backends import ProfileModelBackend
+from relationship_app.models import UserProfile
+from relationship_app.views import admin_view, librarian_view, member_view
+
+ROLES = ['admin', 'librarian', 'member']
+VIEWS = [('admin_view', admin_view), ('librarian_view', librarian_view), ('member_view', member_view)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time admin_view, librarian_view and member_view for a user of every role '
+        'and count their queries, loading the user with ModelBackend and with '
+        'ProfileModelBackend. Test users are created inside a transaction that is '
+        'rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per measurement (default: 500)')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the fastest run is reported')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory(SERVER_NAME='localhost')
+        number = options['requests']
+
+        with transaction.atomic():
+            users = {}
+            for role in ROLES:
+                user = get_user_model().objects.create_user(f'benchmark_{role}', f'{role}@example.com', None)
+                UserProfile.objects.filter(user=user).update(role=role)
+                users[role] = user
+
+            for backend in [ModelBackend(), ProfileModelBackend()]:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{backend.__class__.__name__}:'))
+                for name, view in VIEWS:
+                    for role, user in users.items():
+                        def request():
+                            request = factory.get('/')
+                            # What AuthenticationMiddleware does with the session's user id
+                            request.user = backend.get_user(user.pk)
+                            return view(request)
+
+                        with CaptureQueriesContext(connection) as queries:
+                            response = request()
+                        seconds = min(timeit.repeat(request, number=number, repeat=options['repeat'])) / number
+                        self.stdout.write(
+                            f'    {name:<15} {role:<10} {response.status_code}  '
+                            f'{len(queries)} queries  {seconds * 1000000:8.1f} us/request'
+                        )
+
+            transaction.set_rollback(True)
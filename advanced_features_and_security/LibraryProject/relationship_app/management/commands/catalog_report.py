@@ -0,0 +1,54 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from relationship_app.models import Author, Library
+from relationship_app.query_samples import books_by_authors, books_in_libraries, librarians_of_libraries
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the catalog report (books by author, books in library, librarian of '
+        'library) as CSV. Rows are streamed from the database as they are written.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors-file',
+                            help='Report on the author names in this file (one per line) instead of all authors')
+        parser.add_argument('--libraries-file',
+                            help='Report on the library names in this file (one per line) instead of all libraries')
+        parser.add_argument('--output', help='CSV file to write (default: standard output)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Names looked up per query (default: 500)')
+
+    def read_names(self, path):
+        with open(path) as names_file:
+            for line in names_file:
+                if name := line.strip():
+                    yield name
+
+    def get_author_names(self, options):
+        if options['authors_file']:
+            return self.read_names(options['authors_file'])
+        return Author.objects.order_by('name').values_list('name', flat=True).distinct().iterator()
+
+    def get_library_names(self, options):
+        if options['libraries_file']:
+            return self.read_names(options['libraries_file'])
+        return Library.objects.order_by('name').values_list('name', flat=True).distinct().iterator()
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['report', 'name', 'value'])
+            for author, title in books_by_authors(self.get_author_names(options), batch_size):
+                writer.writerow(['books_by_author', author, title])
+            for library, title in books_in_libraries(self.get_library_names(options), batch_size):
+                writer.writerow(['books_in_library', library, title])
+            for library, librarian in librarians_of_libraries(self.get_library_names(options), batch_size):
+                writer.writerow(['librarian_of_library', library, librarian])
+        finally:
+            if output is not self.stdout:
+                output.close()
@@ -1,19 +1,21 @@
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser, UserManager as DefaultUserManager
-from django.contrib.auth.models import BaseUserManager
+from django.contrib.auth.models import BaseUserManager, Group, Permission
 from django.conf import settings
 
+from .permissions import invalidate_permission_snapshots, permission_relations
+
 # Create your models here.
 class Author(models.Model):
-    name=models.CharField(max_length=50)
+    name=models.CharField(max_length=50, db_index=True)
 
     def __str__(self):
         return self.name
 
 class Book(models.Model):
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     author = models.ForeignKey(Author, on_delete=models.CASCADE)
 
     class Meta:
@@ -50,8 +52,29 @@ class UserProfile(models.Model):
     user=models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
 
+    # Fields whose changes sync_user_profile writes when the user is saved
+    tracked_fields = ('role',)
+
     def __str__(self):
         return (f"{self.user}, {self.role}")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_saved_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_saved_values()
+
+    def _remember_saved_values(self):
+        self._saved_values = {field: getattr(self, field) for field in self.tracked_fields}
+
+    def get_changed_fields(self):
+        """Tracked fields changed since the profile was loaded or saved."""
+        saved = getattr(self, '_saved_values', {})
+        return [field for field in self.tracked_fields if saved.get(field) != getattr(self, field)]
     
 class CustomUserManager(BaseUserManager):
        
@@ -88,10 +111,48 @@ class CustomUser(AbstractUser):
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_user_profile(sender, instance, created, **kwargs):
+def sync_user_profile(sender, instance, created, raw, **kwargs):
+    """
+    Create the profile of new users, and save the profile of existing users
+    only when it is loaded on the instance and one of its tracked fields
+    changed (user.userprofile.role = ...; user.save()). Saves that don't
+    touch the profile, like the last_login update on every login, run no
+    profile query at all.
+
+    bulk_create() sends no post_save: use profiles.bulk_create_users(), or
+    the backfill_user_profiles command for users created without a profile.
+    """
+    if raw:
+        # loaddata: the fixture brings its own profiles
+        return
     if created:
         UserProfile.objects.create(user=instance)
+        return
 
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
\ No newline at end of file
+    profile = UserProfile.user.field.remote_field.get_cached_value(instance, None)
+    if profile is None:
+        return
+    if profile._state.adding:
+        profile.save()
+    elif changed := profile.get_changed_fields():
+        profile.save(update_fields=changed)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_permissions(sender, **kwargs):
+    """
+    Rebuild every permission snapshot on its next use, once the change is
+    committed: a request reading the old grants until then would otherwise
+    cache them under the new version.
+    """
+    transaction.on_commit(invalidate_permission_snapshots)
+
+
+@receiver(m2m_changed)
+def invalidate_permission_grants(sender, action, **kwargs):
+    """Same, when users join or leave groups or permissions are (un)granted."""
+    if action in ('post_add', 'post_remove', 'post_clear') and sender in permission_relations():
+        transaction.on_commit(invalidate_permission_snapshots)
@@ -0,0 +1,146 @@
+import base64
+import json
+import uuid
+from itertools import islice
+
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+class KeysetPage:
+    """One page of rows plus the cursors of its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) pagination for template views.
+
+    Pages are fetched with a WHERE clause starting right after the last row
+    of the previous page instead of an OFFSET, e.g. for ordering
+    ('title', 'id'):
+
+        WHERE title > 'Emma' OR (title = 'Emma' AND id > 3)
+
+    so the last page is as cheap as the first. The ordering fields must be
+    ascending, non-nullable and end with a unique field.
+
+    Cursors are opaque base64 encoded JSON passed in ?cursor=; a cursor that
+    can't be decoded raises Http404, and one whose values don't fit the
+    ordering fields raises BadRequest (400).
+    """
+    cursor_param = 'cursor'
+
+    def __init__(self, ordering=('title', 'id'), page_size=50):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    def paginate(self, queryset, request):
+        position, reverse = self.decode_cursor(request.GET.get(self.cursor_param), queryset.model)
+
+        if reverse:
+            queryset = queryset.order_by(*[f'-{field}' for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        # One extra row tells whether there is more in this direction
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next, has_previous = (position is not None, has_more) if reverse else (has_more, position is not None)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], reverse=False) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], reverse=True) if has_previous and rows else None,
+        )
+
+    def keyset_filter(self, position, reverse):
+        """f1 > v1 OR (f1 = v1 AND f2 > v2) OR ... (< when walking backwards)"""
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            clause = Q(**{f'{field}__{lookup}': position[i]})
+            for j in range(i):
+                clause &= Q(**{self.ordering[j]: position[j]})
+            condition |= clause
+        return condition
+
+    def encode_cursor(self, instance, reverse):
+        payload = {'p': [getattr(instance, field) for field in self.ordering]}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        """Return (position, reverse); the first page has no position."""
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise Http404('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise Http404('Invalid cursor')
+        try:
+            position = [
+                model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, position)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise BadRequest('Invalid cursor')
+        if None in position:
+            raise BadRequest('Invalid cursor')
+        return position, reverse
+
+
+def stream_template(request, template_name, context, rows_template, rows, chunk_size=500):
+    """
+    Render `template_name` as a StreamingHttpResponse, with the rows sent to
+    the client while they are read from the database.
+
+    The page template must output {{ stream_rows }} where the rows go. It is
+    rendered once with an empty `books` list and split at that spot; then
+    `rows` (a queryset) is read with iterator(chunk_size) and every chunk is
+    rendered with `rows_template` as `books`. The page head goes out before
+    the first query runs, so the time to first byte doesn't depend on the
+    number of rows, and only one chunk is held in memory.
+    """
+    marker = f'<!--rows-{uuid.uuid4().hex}-->'
+    page = render_to_string(template_name, {**context, 'books': [], 'stream_rows': mark_safe(marker)}, request)
+    head, tail = page.split(marker)
+
+    def content():
+        yield head
+        iterator = rows.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(iterator, chunk_size)):
+            yield render_to_string(rows_template, {**context, 'books': chunk}, request)
+        yield tail
+
+    return StreamingHttpResponse(content())
@@ -0,0 +1,90 @@
+"""
+Permission snapshots.
+
+ModelBackend reads a user's permissions with two queries the first time a
+request checks one (a @permission_required view, {{ perms }} in a
+template) and forgets them at the end of the request. Instead,
+ProfileModelBackend (backends.py) reads them once into a snapshot, the
+set of 'app_label.codename' strings, stored in the default cache and
+shared by every session of the user. After that, permission checks don't
+query the database.
+
+The default cache must be shared by every process of the site (see
+CACHES in settings.py): the version token is replaced in the cache of
+the process that saw the change, and a process with its own cache would
+keep its snapshots, revoked permissions included, until they expire.
+
+Snapshot keys carry a version token. The receivers in models.py replace
+it whenever a group, a permission, a user's groups or user permissions,
+or a group's permissions change, once the transaction commits, so every
+snapshot is rebuilt on its next use; PERMISSION_SNAPSHOT_TIMEOUT (seconds, default one hour) bounds how
+long an unused one stays in the cache. The superuser flag is part of the
+key, and is_active is checked on the user object on every request.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+
+VERSION_KEY = 'auth:permissions_version'
+SNAPSHOT_KEY = 'auth:permissions:{}:{}:{}'
+
+
+def get_permissions_version():
+    """Token replaced on every permission change, part of the snapshot keys."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate_permission_snapshots():
+    cache.delete(VERSION_KEY)
+
+
+def permission_relations():
+    """The many-to-many tables that grant permissions."""
+    UserModel = get_user_model()
+    return {
+        UserModel._meta.get_field('groups').remote_field.through,
+        UserModel._meta.get_field('user_permissions').remote_field.through,
+        Group.permissions.through,
+    }
+
+
+def load_permissions(user):
+    """Set of 'app_label.codename' granted to `user`, directly or by a group."""
+    if user.is_superuser:
+        permissions = Permission.objects.all()
+    else:
+        # Read through the user's own join tables: the reverse 'user'
+        # lookups on Permission and Group are shared with
+        # relationship_app.CustomUser
+        UserModel = get_user_model()
+        direct = UserModel._meta.get_field('user_permissions')
+        groups = UserModel._meta.get_field('groups')
+        direct_ids = direct.remote_field.through.objects.filter(
+            **{direct.m2m_field_name(): user.pk}
+        ).values(direct.m2m_reverse_field_name())
+        group_ids = groups.remote_field.through.objects.filter(
+            **{groups.m2m_field_name(): user.pk}
+        ).values(groups.m2m_reverse_field_name())
+        permissions = Permission.objects.filter(pk__in=direct_ids) | Permission.objects.filter(group__in=group_ids)
+    return {
+        f'{app_label}.{codename}'
+        for app_label, codename in permissions.values_list('content_type__app_label', 'codename')
+    }
+
+
+def get_permission_snapshot(user):
+    """load_permissions(user), from the cache when it's up to date."""
+    key = SNAPSHOT_KEY.format(user.pk, int(user.is_superuser), get_permissions_version())
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = load_permissions(user)
+        cache.set(key, snapshot, getattr(settings, 'PERMISSION_SNAPSHOT_TIMEOUT', 3600))
+    return snapshot
@@ -1,3 +1,5 @@
+from itertools import islice
+
 from relationship_app.models import Author, Book, Library, Librarian
 
 def books_by_author(author_name):
@@ -41,4 +43,45 @@ def librarian_of_library(library_name):
 
     except Library.DoesNotExist:
         print(f"Library '{library_name}' not found.")
-        return None
\ No newline at end of file
+        return None
+
+# Batched variants for reports over many authors and libraries. They take
+# any iterable of names, look them up with one IN query per `batch_size`
+# names (instead of one get() per name) and yield rows as they are read,
+# so neither the names nor the results have to fit in memory. Unknown
+# names yield nothing.
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def books_by_authors(author_names, batch_size=500):
+    """Yield (author_name, book_title) pairs, by author then title."""
+    for names in _batches(author_names, batch_size):
+        yield from (
+            Book.objects.filter(author__name__in=names)
+            .order_by('author__name', 'title', 'id')
+            .values_list('author__name', 'title')
+            .iterator(chunk_size=2000)
+        )
+
+def books_in_libraries(library_names, batch_size=500):
+    """Yield (library_name, book_title) pairs, by library then title."""
+    for names in _batches(library_names, batch_size):
+        yield from (
+            Library.objects.filter(name__in=names, books__isnull=False)
+            .order_by('name', 'books__title', 'books__id')
+            .values_list('name', 'books__title')
+            .iterator(chunk_size=2000)
+        )
+
+def librarians_of_libraries(library_names, batch_size=500):
+    """Yield (library_name, librarian_name) pairs, by library."""
+    for names in _batches(library_names, batch_size):
+        yield from (
+            Librarian.objects.filter(library__name__in=names)
+            .order_by('library__name', 'id')
+            .values_list('library__name', 'name')
+            .iterator(chunk_size=2000)
+        )
@@ -1,3 +1,393 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from LibraryProject.testing import isolated_caches
+
+from .models import Author, Book, Library, Librarian, UserProfile
+from .profiles import bulk_create_users, create_missing_profiles
+from .query_samples import books_by_authors, books_in_libraries, librarians_of_libraries
+from .views import BOOKS_PER_PAGE
+
+
+@isolated_caches
+class ConstantQueryTestCase(TestCase):
+    """
+    Regression harness for N+1 queries: the library is grown step by step
+    from 10 to 10,000 books and every page must run the same number of
+    queries at each size.
+    """
+    sizes = [10, 100, 1000, 10000]
+    author_count = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = Author.objects.bulk_create(
+            [Author(name=f'Author {i}') for i in range(cls.author_count)]
+        )
+        cls.library = Library.objects.create(name='Central Library')
+
+    def grow_library(self, size):
+        """Add books until the library holds `size` of them."""
+        start = Book.objects.count()
+        books = Book.objects.bulk_create([
+            Book(title=f'Book {i:05d}', author=self.authors[i % self.author_count])
+            for i in range(start, size)
+        ])
+        self.library.books.add(*books)
+
+    def get(self, url, data=None):
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        return self.client.get(url, data, secure=True)
+
+    def assertConstantQueries(self, url, num_queries):
+        for size in self.sizes:
+            self.grow_library(size)
+            with self.subTest(books=size), self.assertNumQueries(num_queries):
+                response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, '<li>', count=min(size, BOOKS_PER_PAGE))
+
+    def assertConstantStreamingQueries(self, url, num_queries):
+        for size in self.sizes:
+            self.grow_library(size)
+            with self.subTest(books=size), self.assertNumQueries(num_queries):
+                response = self.get(url, {'stream': 1})
+                content = b''.join(response.streaming_content).decode()
+            self.assertEqual(content.count('<li>'), size)
+
+    def test_list_books(self):
+        # One page of books joined with their authors
+        self.assertConstantQueries(reverse('list_books'), 1)
+
+    def test_library_detail(self):
+        # Library, one page of its books joined with their authors
+        self.assertConstantQueries(reverse('library_detail', args=[self.library.pk]), 2)
+
+    def test_list_books_streaming(self):
+        # Chunks of 500 books; Django's iterator() reads them from one query
+        self.assertConstantStreamingQueries(reverse('list_books'), 1)
+
+    def test_library_detail_streaming(self):
+        self.assertConstantStreamingQueries(reverse('library_detail', args=[self.library.pk]), 2)
+
+
+@isolated_caches
+class KeysetPaginationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Jane Austen')
+        # Duplicate titles check the id tie-breaker
+        Book.objects.bulk_create([Book(title=f'Book {i // 2:03d}', author=author) for i in range(120)])
+
+    def get(self, data=None):
+        return self.client.get(reverse('list_books'), data, secure=True)
+
+    def test_walk_forward_and_back(self):
+        expected = list(Book.objects.order_by('title', 'id').values_list('id', flat=True))
+
+        pages = []
+        response = self.get()
+        while True:
+            page = response.context['page']
+            pages.append([book.id for book in page])
+            if not page.has_next:
+                break
+            response = self.get({'cursor': page.next_cursor})
+
+        self.assertEqual([len(page) for page in pages], [50, 50, 20])
+        self.assertEqual(sum(pages, []), expected)
+
+        previous = self.get({'cursor': response.context['page'].previous_cursor}).context['page']
+        self.assertEqual([book.id for book in previous], pages[1])
+        self.assertTrue(previous.has_next)
+        self.assertTrue(previous.has_previous)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get({'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_cursor_values_must_fit_the_ordering(self):
+        for position in (['Emma', 'three'], ['Emma', {'id': 3}], [None, 3]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position}).encode()).decode()
+            self.assertEqual(self.get({'cursor': cursor}).status_code, 400)
+
+
+@isolated_caches
+class RoleViewTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {}
+        for role in ['admin', 'librarian', 'member']:
+            user = get_user_model().objects.create_user(role, f'{role}@example.com', 'password')
+            UserProfile.objects.filter(user=user).update(role=role)
+            cls.users[role] = user
+        cls.no_profile = get_user_model().objects.create_user('visitor', 'visitor@example.com', 'password')
+        cls.no_profile.userprofile.delete()
+
+    def get(self, name):
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        return self.client.get(reverse(name), secure=True)
+
+    def test_role_views(self):
+        for role, user in self.users.items():
+            self.client.force_login(user)
+            for name in ['admin_view', 'librarian_view', 'member_view']:
+                # Session and user with profile; the role check adds nothing
+                with self.subTest(role=role, view=name), self.assertNumQueries(2):
+                    response = self.get(name)
+                self.assertEqual(response.status_code, 200 if name == f'{role}_view' else 302)
+
+    def test_user_without_profile(self):
+        self.client.force_login(self.no_profile)
+        with self.assertNumQueries(2):
+            response = self.get('admin_view')
+        self.assertEqual(response.status_code, 302)
+
+    def test_anonymous(self):
+        with self.assertNumQueries(0):
+            response = self.get('member_view')
+        self.assertEqual(response.status_code, 302)
+
+
+@isolated_caches
+class ProfileSyncTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('reader', 'reader@example.com', 'password')
+
+    def test_profile_created_with_user(self):
+        self.assertEqual(UserProfile.objects.filter(user=self.user).count(), 1)
+
+    def test_user_save_does_not_write_profile(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+        # A loaded but unchanged profile isn't saved either
+        user.userprofile
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_changed_profile_saved_with_user(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.userprofile.role = 'librarian'
+        user.save()
+        self.assertEqual(UserProfile.objects.get(user=user).role, 'librarian')
+
+    def test_bulk_create_users(self):
+        User = get_user_model()
+        users = bulk_create_users(
+            [User(username=f'bulk{i}', email=f'bulk{i}@example.com') for i in range(25)], batch_size=10
+        )
+        self.assertEqual(len(users), 25)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='bulk').count(), 25)
+
+    def test_create_missing_profiles(self):
+        User = get_user_model()
+        User.objects.bulk_create([User(username=f'bulk{i}', email=f'bulk{i}@example.com') for i in range(25)])
+        self.assertEqual(UserProfile.objects.count(), 1)
+
+        # 25 missing profiles in batches of 10: three INSERTs
+        self.assertEqual(create_missing_profiles(batch_size=10), 25)
+        self.assertEqual(UserProfile.objects.count(), 26)
+        self.assertEqual(create_missing_profiles(batch_size=10), 0)
+
+    def test_profiles_created_meanwhile_are_not_counted(self):
+        User = get_user_model()
+        users = User.objects.bulk_create([User(username=f'bulk{i}', email=f'bulk{i}@example.com') for i in range(5)])
+        atomic = transaction.atomic
+        saved = []
+
+        def concurrent_save(*args, **kwargs):
+            # Another request creates a profile after the batch was read
+            if not saved:
+                saved.append(users[0])
+                UserProfile.objects.create(user=users[0])
+            return atomic(*args, **kwargs)
+
+        with mock.patch('relationship_app.profiles.transaction.atomic', side_effect=concurrent_save):
+            self.assertEqual(create_missing_profiles(User.objects.filter(username__startswith='bulk')), 4)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='bulk').count(), 5)
+
+
+@isolated_caches
+class CatalogReportTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        austen = Author.objects.create(name='Jane Austen')
+        orwell = Author.objects.create(name='George Orwell')
+        emma = Book.objects.create(title='Emma', author=austen)
+        persuasion = Book.objects.create(title='Persuasion', author=austen)
+        animal_farm = Book.objects.create(title='Animal Farm', author=orwell)
+        central = Library.objects.create(name='Central')
+        central.books.add(emma, animal_farm)
+        Library.objects.create(name='Annex').books.add(persuasion)
+        Librarian.objects.create(name='Ada', library=central)
+
+    def test_books_by_authors(self):
+        with self.assertNumQueries(1):
+            rows = list(books_by_authors(['Jane Austen', 'George Orwell', 'Nobody']))
+        self.assertEqual(rows, [('George Orwell', 'Animal Farm'), ('Jane Austen', 'Emma'), ('Jane Austen', 'Persuasion')])
+
+    def test_batches(self):
+        # One query per batch of names
+        with self.assertNumQueries(2):
+            rows = list(books_in_libraries(['Central', 'Annex'], batch_size=1))
+        self.assertEqual(rows, [('Central', 'Animal Farm'), ('Central', 'Emma'), ('Annex', 'Persuasion')])
+
+    def test_librarians_of_libraries(self):
+        self.assertEqual(list(librarians_of_libraries(['Central', 'Annex'])), [('Central', 'Ada')])
+
+    def test_catalog_report_command(self):
+        output = StringIO()
+        call_command('catalog_report', stdout=output)
+        rows = list(csv.reader(StringIO(output.getvalue())))
+        self.assertEqual(rows[0], ['report', 'name', 'value'])
+        self.assertIn(['books_by_author', 'Jane Austen', 'Emma'], rows)
+        self.assertIn(['books_in_library', 'Annex', 'Persuasion'], rows)
+        self.assertIn(['librarian_of_library', 'Central', 'Ada'], rows)
+        self.assertEqual(len(rows), 1 + 3 + 3 + 1)
+
+
+@isolated_caches
+class LibraryAdminTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        author = Author.objects.create(name='Jane Austen')
+        cls.books = Book.objects.bulk_create([Book(title=f'Book {i:03d}', author=author) for i in range(120)])
+        cls.spare = Book.objects.create(title='Spare', author=author)
+        cls.library = Library.objects.create(name='Central')
+        cls.library.books.add(*cls.books)
+        cls.url = reverse('admin:relationship_app_library_change', args=[cls.library.pk])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, url, data=None):
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        return self.client.get(url, data, secure=True)
+
+    def test_change_page_shows_one_page_of_books(self):
+        response = self.get(self.url)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.initial_forms), 50)
+        self.assertContains(response, 'Page 1 of 3 (120 books)')
+        # Books are picked with the autocomplete widget, not listed as options
+        self.assertNotContains(response, 'Book 100')
+        self.assertNotContains(response, 'Spare')
+
+        response = self.get(self.url, {f'{formset.prefix}-page': 3})
+        self.assertEqual(len(response.context['inline_admin_formsets'][0].formset.initial_forms), 20)
+
+    def test_save_applies_membership_changes_only(self):
+        through = Library.books.through
+        memberships = dict(through.objects.values_list('book_id', 'pk'))
+
+        formset = self.get(self.url).context['inline_admin_formsets'][0].formset
+        prefix = formset.prefix
+        initial = formset.initial_forms
+        data = {
+            'name': 'Central',
+            f'{prefix}-TOTAL_FORMS': len(initial) + 1,
+            f'{prefix}-INITIAL_FORMS': len(initial),
+            f'{prefix}-MIN_NUM_FORMS': 0,
+            f'{prefix}-MAX_NUM_FORMS': 1000,
+            # New membership in the extra form
+            f'{prefix}-{len(initial)}-library': self.library.pk,
+            f'{prefix}-{len(initial)}-book': self.spare.pk,
+        }
+        for i, form in enumerate(initial):
+            data[f'{prefix}-{i}-id'] = form.instance.pk
+            data[f'{prefix}-{i}-library'] = self.library.pk
+            data[f'{prefix}-{i}-book'] = form.instance.book_id
+        removed = initial[0].instance.book_id
+        data[f'{prefix}-0-DELETE'] = 'on'
+
+        response = self.client.post(self.url, data, secure=True)
+        self.assertEqual(response.status_code, 302)
+
+        after = dict(through.objects.values_list('book_id', 'pk'))
+        self.assertNotIn(removed, after)
+        self.assertIn(self.spare.pk, after)
+        # The other memberships kept their rows
+        del memberships[removed]
+        self.assertEqual({book_id: after[book_id] for book_id in memberships}, memberships)
+
+    def test_book_autocomplete_matches_prefixes(self):
+        params = {'app_label': 'relationship_app', 'model_name': 'library_books', 'field_name': 'book'}
+        response = self.get(reverse('admin:autocomplete'), {**params, 'term': 'Spa'})
+        self.assertEqual([result['text'] for result in response.json()['results']], [str(self.spare)])
+
+        response = self.get(reverse('admin:autocomplete'), {**params, 'term': 'pare'})
+        self.assertEqual(response.json()['results'], [])
+
+
+@isolated_caches
+class ChangeListPerformanceTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.authors = Author.objects.bulk_create([Author(name=f'Author {i}') for i in range(5)])
+        Book.objects.bulk_create([Book(title=f'Book {i}', author=cls.authors[i % 5]) for i in range(30)])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def get_changelist(self):
+        # secure: the project redirects plain HTTP (SECURE_SSL_REDIRECT)
+        return self.client.get(reverse('admin:relationship_app_book_changelist'), secure=True)
+
+    def test_list_select_related_follows_list_display(self):
+        request = RequestFactory().get('/')
+        self.assertEqual(site._registry[Book].get_list_select_related(request), ['author'])
+        self.assertEqual(site._registry[UserProfile].get_list_select_related(request), ['user'])
+        self.assertEqual(site._registry[Author].get_list_select_related(request), False)
+
+    def test_filter_choices_are_cached(self):
+        with CaptureQueriesContext(connection) as first:
+            self.get_changelist()
+        with CaptureQueriesContext(connection) as second:
+            response = self.get_changelist()
+        self.assertEqual(len(second), len(first) - 1)
+        self.assertContains(response, 'Author 4')
+
+        # A new author replaces the cached choices, once committed
+        with self.captureOnCommitCallbacks() as callbacks:
+            Author.objects.create(name='Author 5')
+        self.assertNotContains(self.get_changelist(), 'Author 5')
+        for callback in callbacks:
+            callback()
+        self.assertContains(self.get_changelist(), 'Author 5')
+
+    def test_estimated_count_above_threshold(self):
+        with mock.patch('LibraryProject.admin_mixins.estimated_count', return_value=50000):
+            response = self.get_changelist()
+        self.assertEqual(response.context['cl'].result_count, 50000)
+
+        # Below the threshold, or filtered, the count is exact
+        with mock.patch('LibraryProject.admin_mixins.estimated_count', return_value=500):
+            self.assertEqual(self.get_changelist().context['cl'].result_count, 30)
+        with mock.patch('LibraryProject.admin_mixins.estimated_count', return_value=50000):
+            response = self.client.get(
+                reverse('admin:relationship_app_book_changelist'), {'author__id__exact': self.authors[0].pk},
+                secure=True,
+            )
+        self.assertEqual(response.context['cl'].result_count, 6)
@@ -0,0 +1,61 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+def get_table_versions(*models):
+    """
+    Return a (token, last_modified) pair for each of `models`' tables, in
+    one query.
+
+    The token changes on every write (see touch_tables) and last_modified
+    is the Unix timestamp of that write. Both come from the TableVersion
+    rows, so every worker process agrees on them; the time of the write is
+    part of the token so that a counter restarted from scratch (the rows
+    deleted, a restored backup) never repeats an old token.
+
+    A table without a row yet gets one, as if it had just been written,
+    which can only make clients refetch, never serve stale data.
+    """
+    from .models import TableVersion
+
+    labels = [model._meta.label_lower for model in models]
+    rows = {
+        table: (version, updated)
+        for table, version, updated in TableVersion.objects.filter(table__in=labels).values_list(
+            'table', 'version', 'updated'
+        )
+    }
+    missing = [model for model, label in zip(models, labels) if label not in rows]
+    if missing:
+        touch_tables(*missing)
+        return get_table_versions(*models)
+
+    versions = []
+    for label in labels:
+        version, updated = rows[label]
+        versions.append((f'{version}.{int(updated.timestamp() * 1000000)}', int(updated.timestamp())))
+    return versions
+
+
+def get_table_version(model):
+    """Return (token, last_modified) for `model`'s table, see get_table_versions()."""
+    return get_table_versions(model)[0]
+
+
+def touch_tables(*models):
+    """Record a write to the given models' tables."""
+    from .models import TableVersion
+
+    now = timezone.now()
+    for model in models:
+        label = model._meta.label_lower
+        bump = TableVersion.objects.filter(table=label)
+        if bump.update(version=F('version') + 1, updated=now):
+            continue
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=label, version=1, updated=now)
+        except IntegrityError:
+            # Another request created it first
+            bump.update(version=F('version') + 1, updated=now)
@@ -0,0 +1,69 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_table_versions
+
+
+class NotModified(Exception):
+    """Carries the 304 response out of APIView.initial()."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    View mixin adding ETag / Last-Modified support to GET and HEAD requests.
+
+    The validators come from the per-table version in cache.py (bumped by
+    the post_save/post_delete receivers in models.py), so computing them
+    costs a single primary key query. When the client's If-None-Match or
+    If-Modified-Since still matches, a 304 is returned right after
+    authentication and permission checks, without running the queryset or
+    the serializer.
+
+    The ETag also covers the full path and the Accept header, so each page,
+    filter and format gets its own tag.
+    """
+    conditional_models = None
+
+    def get_conditional_models(self):
+        return self.conditional_models or [self.queryset.model]
+
+    def get_conditional_headers(self, request):
+        """Return (etag, last_modified timestamp) for the current request."""
+        versions = get_table_versions(*self.get_conditional_models())
+        tokens = ':'.join(token for token, _ in versions)
+        last_modified = max(timestamp for _, timestamp in versions)
+
+        raw = '|'.join([tokens, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')])
+        etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.conditional_headers = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        etag, last_modified = self.conditional_headers = self.get_conditional_headers(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        headers = getattr(self, 'conditional_headers', None)
+        if headers and response.status_code in (200, 304):
+            etag, last_modified = headers
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 # Create your models here.
 
@@ -8,3 +10,27 @@ class Book(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class TableVersion(models.Model):
+    """
+    Write counter of a table, the validator behind ETags (see cache.py).
+
+    Kept in the database rather than the cache so that every worker process
+    sees the same version.
+    """
+    table = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.table} v{self.version}'
+
+
+# ETags for the book endpoints are built from a per-table version
+# (TableVersion, see cache.py), bumped on every write.
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def touch_book_version(sender, **kwargs):
+    from .cache import touch_tables
+    touch_tables(sender)
@@ -1,3 +1,57 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Book, TableVersion
 
 # Create your tests here.
+
+class ConditionalGetTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='password123')
+        cls.book = Book.objects.create(title='1984', author='George Orwell')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_book_list_returns_304_when_unchanged(self):
+        url = reverse('book-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Only the table version is read
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_viewset_detail_etag_changes_after_update(self):
+        url = reverse('book_all-detail', kwargs={'pk': self.book.pk})
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url, {'title': 'Animal Farm'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Animal Farm')
+
+    def test_write_from_another_process_changes_etag(self):
+        url = reverse('book-list')
+        etag = self.client.get(url)['ETag']
+
+        # Workers share the database only, not their local caches
+        TableVersion.objects.filter(table='api.book').update(version=F('version') + 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unauthenticated_client_never_gets_304(self):
+        url = reverse('book_all-list')
+        etag = self.client.get(url)['ETag']
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -5,13 +5,17 @@ from .models import Book
 from .serializers import BookSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import IsAdminUser
+from .mixins import ConditionalGetMixin
 
 # Create your views here.
-class BookList(generics.ListAPIView):
+
+# ConditionalGetMixin: responses carry ETag/Last-Modified headers, and
+# If-None-Match/If-Modified-Since requests get a 304 while books are unchanged
+class BookList(ConditionalGetMixin, generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,173 @@
+"""
+Per-request SQL instrumentation.
+
+QueryInstrumentationMiddleware hooks a connection.execute_wrapper() into
+every database connection for the duration of a request and records:
+
+- the number of queries and the total time spent in the database
+- duplicate statements: queries sharing the same SQL fingerprint (the
+  statement with its parameters and literals stripped), the usual sign
+  of an N+1 loop
+
+The numbers are added to the response as a Server-Timing header (visible
+in the browser's network panel) and logged on this module's logger with
+the values in `extra`, so a JSON log formatter can pick them up. For
+streaming responses only the queries run before the body starts streaming
+are counted.
+
+Views can declare a query budget, either as a `query_budget` attribute on
+a class-based view or with the @query_budget(n) decorator. A request over
+its budget raises QueryBudgetExceeded when the QUERY_BUDGET_STRICT setting
+is on (tests), otherwise a warning is logged.
+
+Settings:
+
+- QUERY_INSTRUMENTATION: enable the middleware (default: DEBUG). When off,
+  the middleware removes itself from the chain at startup, so it costs
+  nothing per request.
+- QUERY_BUDGET_STRICT: raise instead of warn on budget overruns.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Quoted strings, numbers, placeholders and IN lists of any length
+FINGERPRINT_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more queries than its `query_budget` allows."""
+
+
+def query_budget(limit):
+    """Decorator setting the query budget of a function-based view."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+def get_query_budget(view_func):
+    """Return the budget declared by the view function or its view class."""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
+
+
+def fingerprint_sql(sql):
+    """Normalize `sql` so queries differing only in their values match."""
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryStats:
+    """connection.execute_wrapper() hook recording the queries of a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            fingerprint = fingerprint_sql(sql)
+            self.fingerprints[fingerprint] += 1
+            self.statements.setdefault(fingerprint, sql)
+
+    @property
+    def duplicates(self):
+        """{fingerprint: count} for statements that ran more than once."""
+        return {fingerprint: count for fingerprint, count in self.fingerprints.items() if count > 1}
+
+    def as_dict(self):
+        return {
+            'queries': self.count,
+            'db_time_ms': round(self.duration * 1000, 2),
+            'duplicates': [
+                {
+                    'fingerprint': hashlib.md5(fingerprint.encode()).hexdigest()[:12],
+                    'count': count,
+                    'sql': self.statements[fingerprint],
+                }
+                for fingerprint, count in sorted(self.duplicates.items(), key=lambda item: -item[1])
+            ],
+        }
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the SQL run by each request (see the module docstring).
+
+    Put it first in MIDDLEWARE so that queries made by the other middleware
+    (sessions, authentication) are counted as well.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = request.query_stats = QueryStats()
+        request.query_budget = None
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+
+        self.add_server_timing(response, stats)
+        self.log(request, response, stats)
+        self.check_budget(request, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func)
+
+    def add_server_timing(self, response, stats):
+        timing = f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+    def log(self, request, response, stats):
+        data = stats.as_dict()
+        logger.info(
+            '%s %s status=%s queries=%d db_time_ms=%.2f duplicates=%d',
+            request.method, request.path, response.status_code,
+            data['queries'], data['db_time_ms'], len(data['duplicates']),
+            extra={'method': request.method, 'path': request.path,
+                   'status': response.status_code, 'query_stats': data},
+        )
+
+    def check_budget(self, request, stats):
+        budget = request.query_budget
+        if budget is None or stats.count <= budget:
+            return
+        message = f'{request.method} {request.path} ran {stats.count} queries (budget: {budget})'
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={'query_stats': stats.as_dict()})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,7 +42,11 @@ INSTALLED_APPS = [
     'relationship_app.apps.RelationshipAppConfig',
 ]
 
+# Loads the user's UserProfile along with the user for the role checks
+AUTHENTICATION_BACKENDS = ['relationship_app.backends.ProfileModelBackend']
+
 MIDDLEWARE = [
+    'LibraryProject.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,3 +135,10 @@ LOGIN_URL = 'relationship/login/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Per-request SQL instrumentation (see LibraryProject/middleware.py):
+# query count and DB time in the Server-Timing header and the log
+QUERY_INSTRUMENTATION = DEBUG
+
+# Raise instead of logging a warning when a view exceeds its query budget
+QUERY_BUDGET_STRICT = 'test' in sys.argv
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from relationship_app.profiles import create_missing_profiles
+
+
+class Command(BaseCommand):
+    help = 'Create the missing UserProfile of users created without one (e.g. with bulk_create), in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Profiles created per INSERT and transaction (default: 1000)')
+
+    def handle(self, *args, **options):
+        created = create_missing_profiles(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} missing user profiles.'))
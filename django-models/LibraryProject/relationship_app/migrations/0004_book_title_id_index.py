@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0003_alter_book_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', 'id'], name='relationship_book_title_id_idx'),
+        ),
+    ]
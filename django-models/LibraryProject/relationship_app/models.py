@@ -20,6 +20,10 @@ class Book(models.Model):
             ("can_change_book", "Can change an existing book entry"),
             ("can_delete_book", "Can delete a book entry"),
         ]
+        # The keyset pages of the book list walk (title, id)
+        indexes = [
+            models.Index(fields=['title', 'id'], name='relationship_book_title_id_idx'),
+        ]
         
     def __str__(self):
         return (f"{self.title}, {self.author},")
@@ -48,15 +52,54 @@ class UserProfile(models.Model):
     user=models.OneToOneField(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
 
+    # Fields whose changes sync_user_profile writes when the user is saved
+    tracked_fields = ('role',)
+
     def __str__(self):
         return (f"{self.user}, {self.role}")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_saved_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_saved_values()
+
+    def _remember_saved_values(self):
+        self._saved_values = {field: getattr(self, field) for field in self.tracked_fields}
+
+    def get_changed_fields(self):
+        """Tracked fields changed since the profile was loaded or saved."""
+        saved = getattr(self, '_saved_values', {})
+        return [field for field in self.tracked_fields if saved.get(field) != getattr(self, field)]
+
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+def sync_user_profile(sender, instance, created, raw, **kwargs):
+    """
+    Create the profile of new users, and save the profile of existing users
+    only when it is loaded on the instance and one of its tracked fields
+    changed (user.userprofile.role = ...; user.save()). Saves that don't
+    touch the profile, like the last_login update on every login, run no
+    profile query at all.
+
+    bulk_create() sends no post_save: use profiles.bulk_create_users(), or
+    the backfill_user_profiles command for users created without a profile.
+    """
+    if raw:
+        # loaddata: the fixture brings its own profiles
+        return
     if created:
         UserProfile.objects.create(user=instance)
+        return
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
\ No newline at end of file
+    profile = UserProfile.user.field.remote_field.get_cached_value(instance, None)
+    if profile is None:
+        return
+    if profile._state.adding:
+        profile.save()
+    elif changed := profile.get_changed_fields():
+        profile.save(update_fields=changed)
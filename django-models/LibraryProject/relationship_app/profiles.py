@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import UserProfile
+
+
+def create_missing_profiles(users=None, batch_size=1000):
+    """
+    Create a UserProfile for every user of `users` (a queryset, default: all
+    users) that has none, `batch_size` profiles per INSERT and transaction.
+
+    Batches are walked by primary key, so each one is an indexed range
+    query however many users there are. Returns the number of profiles
+    created: profiles that another transaction created for the batch's
+    users before its INSERT aren't counted.
+    """
+    if users is None:
+        users = get_user_model()._default_manager.all()
+    missing = users.filter(userprofile__isnull=True).order_by('pk').values_list('pk', flat=True)
+
+    created = 0
+    last_pk = None
+    while True:
+        batch = missing if last_pk is None else missing.filter(pk__gt=last_pk)
+        user_ids = list(batch[:batch_size])
+        if not user_ids:
+            return created
+        with transaction.atomic():
+            # ignore_conflicts: a profile created meanwhile (e.g. by a
+            # concurrent save of the same user) is kept as it is, and isn't
+            # counted
+            existing = UserProfile.objects.filter(user_id__in=user_ids).count()
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+            )
+        created += len(user_ids) - existing
+        last_pk = user_ids[-1]
+
+
+def bulk_create_users(users, batch_size=1000):
+    """
+    bulk_create() `users` together with their profiles.
+
+    bulk_create() sends no post_save signal, so sync_user_profile doesn't
+    run for these users. Databases that don't return the new primary keys
+    (MySQL) are handled by looking the users up by username.
+    """
+    UserModel = get_user_model()
+    with transaction.atomic():
+        users = UserModel._default_manager.bulk_create(users, batch_size=batch_size)
+        if all(user.pk is not None for user in users):
+            created = UserModel._default_manager.filter(pk__in=[user.pk for user in users])
+        else:
+            usernames = [user.get_username() for user in users]
+            created = UserModel._default_manager.filter(**{f'{UserModel.USERNAME_FIELD}__in': usernames})
+        create_missing_profiles(created, batch_size=batch_size)
+    return users
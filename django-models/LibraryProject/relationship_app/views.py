@@ -7,16 +7,32 @@ from .forms import CustomerUserCreationForm, BookForm
 from django.contrib.auth.forms import UserCreationForm 
 from .models import Book
 from .models import Library
+from .models import UserProfile
 from django.views.generic.detail import DetailView
 from django.contrib.auth.decorators import user_passes_test
 from django.http import HttpResponseForbidden
 from django.forms import ModelForm 
+from .pagination import KeysetPaginator, stream_template
 
 
 # Create your views here.
+BOOKS_PER_PAGE = 50
+
+
 def list_books(request):
-    books = Book.objects.all()
-    context = {'books': books}
+    # The template shows book.author.name: fetch the authors in the same
+    # query instead of one query per book
+    books = Book.objects.select_related('author').order_by('title', 'id')
+
+    # ?stream=1 sends the whole list, flushed to the client as it is read
+    if request.GET.get('stream'):
+        return stream_template(
+            request, 'relationship_app/list_books.html', {},
+            'relationship_app/book_rows.html', books,
+        )
+
+    page = KeysetPaginator(page_size=BOOKS_PER_PAGE).paginate(books, request)
+    context = {'books': page, 'page': page}
 
     return render(request, 'relationship_app/list_books.html', context)
 
@@ -25,6 +41,26 @@ class LibraryDetailView(DetailView):
     template_name = 'relationship_app/library_detail.html'
     context_object_name = 'library'
 
+    def get_books(self):
+        # book.author.name in the template: joined instead of one query per book
+        return self.object.books.select_related('author').order_by('title', 'id')
+
+    def get(self, request, *args, **kwargs):
+        # ?stream=1 sends every book of the library, see list_books
+        if request.GET.get('stream'):
+            self.object = self.get_object()
+            return stream_template(
+                request, self.template_name, {'library': self.object},
+                'relationship_app/library_book_rows.html', self.get_books(),
+            )
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = KeysetPaginator(page_size=BOOKS_PER_PAGE).paginate(self.get_books(), self.request)
+        context['books'] = context['page'] = page
+        return context
+
 def register(request):
     if request.method == 'POST':
         form = CustomerUserCreationForm(request.POST)
@@ -54,14 +90,27 @@ def user_logout(request):
     logout(request)
     return render(request, 'relationship_app/logout.html')
 
+def get_role(user):
+    """
+    Return the role stored on the user's UserProfile ('admin', 'librarian'
+    or 'member'), or None for anonymous users and users without a profile.
+
+    The profile is loaded together with the user by ProfileModelBackend, so
+    this doesn't query the database.
+    """
+    try:
+        return user.userprofile.role
+    except (AttributeError, UserProfile.DoesNotExist):
+        return None
+
 def is_admin(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Admin'
+    return get_role(user) == 'admin'
 
 def is_librarian(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Librarian'
+    return get_role(user) == 'librarian'
 
 def is_member(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Member'
+    return get_role(user) == 'member'
 
 @user_passes_test(is_admin)
 def admin_view(request):
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the user's Profile in the same query.
+
+    AuthenticationMiddleware gets request.user from get_user(), so with the
+    profile joined in, request.user.profile (the profile view and template,
+    the post counters) never runs a query of its own. Users without a
+    profile are cached as such too: the LEFT OUTER JOIN tells there is none.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
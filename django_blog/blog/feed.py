@@ -0,0 +1,59 @@
+"""
+Cache versions of the post feed.
+
+The feed view caches each rendered page as a template fragment, keyed on
+the page's cursor and a feed version made of two tokens:
+
+- the feed token, replaced when a post is edited or deleted: the post may
+  be on any page, so every cached page is dropped
+- the head token, replaced when a post is created. A new post is the
+  newest one, so it only changes the pages reached from the top of the
+  feed: the first page and the pages fetched backwards with a "previous"
+  cursor. Pages after a "next" cursor hold the posts older than that
+  cursor, which a new post doesn't change, so their key leaves the head
+  token out and they stay cached.
+
+The tokens and the pages live in the default cache, which must be shared
+by every process of the site (see CACHES in settings.py): a token is only
+replaced in the cache of the process that saw the write. The receivers in
+models.py replace them once the write commits, so that a request reading
+the feed before the commit can't cache the old page under the new
+version. Cached pages also expire after FEED_CACHE_TIMEOUT seconds, which
+bounds how long an author's renamed username can show.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'blog:feed_version'
+FEED_HEAD_VERSION_KEY = 'blog:feed_head_version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_feed_version(head=True):
+    """Version of a feed page; pass head=False for pages after a next cursor."""
+    version = get_version(FEED_VERSION_KEY)
+    if head:
+        version = f'{version}.{get_version(FEED_HEAD_VERSION_KEY)}'
+    return version
+
+
+def get_feed_cache_timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 600)
+
+
+def invalidate_feed():
+    cache.delete(FEED_VERSION_KEY)
+
+
+def invalidate_feed_head():
+    cache.delete(FEED_HEAD_VERSION_KEY)
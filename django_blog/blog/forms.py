@@ -12,12 +12,31 @@ class CustomUserCreationForm(UserCreationForm):
         model = user
         fields = ('username', 'email')
 
-class ProfileUpdateForm(forms.ModelForm):
+class ChangedFieldsModelForm(forms.ModelForm):
+    """
+    ModelForm that saves an existing instance with update_fields set to the
+    fields the user changed, and doesn't write at all when there are none.
+    Columns the form doesn't show, like Profile.post_count, are never
+    overwritten with the values read when the page was loaded.
+    """
+
+    def save(self, commit=True):
+        if not commit or self.instance._state.adding or self.errors:
+            # New instances are inserted whole; errors raise ValueError
+            return super().save(commit)
+        concrete = {field.name for field in self.instance._meta.concrete_fields}
+        changed = [name for name in self.changed_data if name in concrete]
+        if changed:
+            self.instance.save(update_fields=changed)
+        self._save_m2m()
+        return self.instance
+
+class ProfileUpdateForm(ChangedFieldsModelForm):
     class Meta:
         model = Profile
         fields = ('bio', 'profile_picture')
 
-class UserUpdateForm(forms.ModelForm):
+class UserUpdateForm(ChangedFieldsModelForm):
     class Meta:
         model = User
         fields = ('username', 'email')
\ No newline at end of file
@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from blog.feed import invalidate_feed
+from blog.models import Post
+from blog.pagination import KeysetPaginator
+from blog.views import POSTS_PER_PAGE, post_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the first and the last page of the post feed of a blog with '
+        '--posts posts, with an empty and a warm fragment cache, and compare '
+        'the page query with OFFSET pagination. The posts are created inside '
+        'a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000,
+                            help='Posts in the benchmark blog (default: 100000)')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requests per measurement (default: 50)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Posts per INSERT (default: 5000)')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory(SERVER_NAME='localhost')
+        number = options['requests']
+        total = options['posts']
+
+        with transaction.atomic():
+            authors = [User.objects.create_user(f'benchmark_author_{i}') for i in range(10)]
+            for start in range(0, total, options['batch_size']):
+                Post.objects.bulk_create([
+                    Post(title=f'Post {i}', content='Lorem ipsum dolor sit amet. ' * 20, author=authors[i % 10])
+                    for i in range(start, min(start + options['batch_size'], total))
+                ])
+
+            # The last page is reached with the cursor of the post just
+            # before it, the (POSTS_PER_PAGE + 1)th oldest
+            paginator = KeysetPaginator(page_size=POSTS_PER_PAGE)
+            before_last = Post.objects.order_by('published_date', 'id')[POSTS_PER_PAGE]
+            pages = [('first page', {}), ('last page', {'cursor': paginator.encode_cursor(before_last, reverse=False)})]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Feed view, {total} posts:'))
+            for label, params in pages:
+                for cache_state in ['cold', 'warm']:
+                    def request():
+                        if cache_state == 'cold':
+                            invalidate_feed()
+                        return post_feed(factory.get('/posts/', params))
+
+                    request()
+                    self.report(f'{label:<11} {cache_state:<5}', request, number)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Page query only:'))
+            posts = Post.objects.select_related('author')
+            for label, params in pages:
+                self.report(f'{label:<11} keyset', lambda: list(paginator.paginate(posts, factory.get('/', params))), number)
+            ordered = posts.order_by('-published_date', '-id')
+            num_pages = Paginator(ordered, POSTS_PER_PAGE).num_pages
+            for label, page_number in [('first page', 1), ('last page', num_pages)]:
+                # A new Paginator per request, as a view would run its COUNT(*)
+                self.report(
+                    f'{label:<11} offset',
+                    lambda: list(Paginator(ordered, POSTS_PER_PAGE).page(page_number)), number,
+                )
+
+            transaction.set_rollback(True)
+
+    def report(self, label, function, number):
+        with CaptureQueriesContext(connection) as queries:
+            function()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        seconds = (time.perf_counter() - start) / number
+        self.stdout.write(f'    {label}  {len(queries)} queries  {seconds * 1000:8.2f} ms/request')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Profile
+from django_blog.thumbnails import generate_thumbnails, has_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate the missing thumbnails of profile pictures, e.g. for pictures uploaded before thumbnails existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate existing thumbnails too (e.g. after changing THUMBNAIL_SIZES)')
+
+    def handle(self, *args, **options):
+        count = 0
+        for profile in Profile.objects.exclude(profile_picture='').exclude(profile_picture=None).iterator():
+            picture = profile.profile_picture
+            if options['force'] or not has_thumbnails(picture):
+                try:
+                    generate_thumbnails(picture.storage, picture.name)
+                except OSError as error:
+                    self.stderr.write(f'{picture.name}: {error}')
+                    continue
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {count} profile pictures.'))
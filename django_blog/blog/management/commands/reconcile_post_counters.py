@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from blog.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute Profile.post_count and Profile.last_published_at from the posts, '
+        'e.g. after bulk_create() or after adding the fields. The posts are read with '
+        'a single GROUP BY query; only the profiles that are off are written.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Profiles written per UPDATE batch (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the profiles that are off without fixing them')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Lock the profiles first, so posts created meanwhile wait and
+            # are counted both ways
+            profiles = list(
+                Profile.objects.select_for_update().only('id', 'user_id', 'post_count', 'last_published_at')
+            )
+            counters = {
+                row['author_id']: (row['count'], row['last'])
+                for row in Post.objects.order_by().values('author_id').annotate(
+                    count=Count('id'), last=Max('published_date'),
+                )
+            }
+            changed = []
+            for profile in profiles:
+                post_count, last_published_at = counters.get(profile.user_id, (0, None))
+                if (profile.post_count, profile.last_published_at) != (post_count, last_published_at):
+                    profile.post_count, profile.last_published_at = post_count, last_published_at
+                    changed.append(profile)
+
+            if not options['dry_run']:
+                Profile.objects.bulk_update(
+                    changed, ['post_count', 'last_published_at'], batch_size=options['batch_size'],
+                )
+
+        verb = 'Would fix' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} the post counters of {len(changed)} profiles.'))
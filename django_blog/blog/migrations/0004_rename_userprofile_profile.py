@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 09:30
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_feed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='UserProfile',
+            new_name='Profile',
+        ),
+    ]
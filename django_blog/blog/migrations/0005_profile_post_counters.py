@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-17 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def count_posts(apps, schema_editor):
+    """
+    Fill the new counters from the existing posts with one GROUP BY query,
+    creating the profiles that authors don't have yet.
+    """
+    Post = apps.get_model('blog', 'Post')
+    Profile = apps.get_model('blog', 'Profile')
+    counters = {
+        row['author_id']: (row['count'], row['last'])
+        for row in Post.objects.order_by().values('author_id').annotate(
+            count=Count('id'), last=Max('published_date'),
+        )
+    }
+    profiles = list(Profile.objects.filter(user_id__in=counters).only('id', 'user_id'))
+    for profile in profiles:
+        profile.post_count, profile.last_published_at = counters.pop(profile.user_id)
+    Profile.objects.bulk_update(profiles, ['post_count', 'last_published_at'], batch_size=1000)
+    Profile.objects.bulk_create([
+        Profile(user_id=user_id, post_count=post_count, last_published_at=last_published_at)
+        for user_id, (post_count, last_published_at) in counters.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_rename_userprofile_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='last_published_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-published_date'], name='blog_post_author_date_idx'),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,112 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 
+from django_blog.thumbnails import schedule_thumbnails
+
+from .feed import invalidate_feed, invalidate_feed_head
+
 # Create your models here.
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    # Denormalized from the user's posts by Post.save() and the post_delete
+    # receiver below; `manage.py reconcile_post_counters` recomputes them
+    post_count = models.PositiveIntegerField(default=0)
+    last_published_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f'{self.user.username}\'s Profile'
 
+
+@receiver(post_save, sender=Profile)
+def generate_profile_thumbnails(sender, instance, update_fields, raw, **kwargs):
+    """Thumbnail a new profile picture in the background (see thumbnails.py)."""
+    if raw or (update_fields is not None and 'profile_picture' not in update_fields):
+        return
+    schedule_thumbnails(instance.profile_picture)
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     published_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey('auth.User', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # The feed order, newest first, for keyset pagination
+            models.Index(fields=['-published_date', '-id'], name='blog_post_feed_idx'),
+            # An author's latest post, for Profile.last_published_at
+            models.Index(fields=['author', '-published_date'], name='blog_post_author_date_idx'),
+        ]
+
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        # A new post and its author's counters are written together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            published = Value(self.published_date)
+            counters = Profile.objects.filter(user_id=self.author_id)
+            update = {
+                'post_count': F('post_count') + 1,
+                'last_published_at': Greatest(Coalesce('last_published_at', published), published),
+            }
+            if not counters.update(**update):
+                # No profile yet: it starts from all the author's posts,
+                # this one included
+                _, created = get_or_create_profile(self.author_id)
+                if not created:
+                    # Created meanwhile by a transaction that can't see
+                    # this post yet
+                    counters.update(**update)
+
+
+def get_or_create_profile(user_id):
+    """
+    Profile.objects.get_or_create() for the user, with the counters of a new
+    profile read from the user's posts in one aggregate query.
+    """
+    counters = Post.objects.filter(author_id=user_id).aggregate(
+        post_count=Count('id'), last_published_at=Max('published_date'),
+    )
+    return Profile.objects.get_or_create(user_id=user_id, defaults=counters)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_feed(sender, instance, created, **kwargs):
+    """
+    A new post only changes the top of the feed (see feed.py); an edited
+    one can be on any page. Both wait for the commit.
+    """
+    if created:
+        transaction.on_commit(invalidate_feed_head)
+    else:
+        transaction.on_commit(invalidate_feed)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_post_feed_on_delete(sender, **kwargs):
+    transaction.on_commit(invalidate_feed)
+
+
+
+@receiver(post_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    """
+    Update the author's counters. Deletions send post_delete inside their
+    transaction, queryset and cascading deletes included.
+    """
+    latest = Post.objects.filter(author_id=OuterRef('user_id')).order_by('-published_date')
+    Profile.objects.filter(user_id=instance.author_id).update(
+        post_count=Greatest(F('post_count') - 1, Value(0)),
+        last_published_at=Subquery(latest.values('published_date')[:1]),
+    )
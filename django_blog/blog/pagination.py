@@ -0,0 +1,130 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    """One page of rows plus the cursors of its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) pagination for template views.
+
+    Pages are fetched with a WHERE clause starting right after the last row
+    of the previous page instead of an OFFSET, e.g. for the newest-first
+    ordering ('-published_date', '-id'):
+
+        WHERE published_date < '2025-12-16 06:50' OR
+              (published_date = '2025-12-16 06:50' AND id < 3)
+
+    so the last page is as cheap as the first. The ordering fields must be
+    non-nullable and end with a unique field; prefix a field with '-' to
+    sort it descending.
+
+    Cursors are opaque base64 encoded JSON passed in ?cursor=; an invalid
+    cursor raises Http404. Call decode_cursor() up front to check it before
+    any query runs.
+    """
+    cursor_param = 'cursor'
+
+    def __init__(self, ordering=('-published_date', '-id'), page_size=20):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    @property
+    def fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def paginate(self, queryset, request):
+        position, reverse = self.decode_cursor(request.GET.get(self.cursor_param), queryset.model)
+
+        if reverse:
+            queryset = queryset.order_by(*[self.flip(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        # One extra row tells whether there is more in this direction
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next, has_previous = (position is not None, has_more) if reverse else (has_more, position is not None)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], reverse=False) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], reverse=True) if has_previous and rows else None,
+        )
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def keyset_filter(self, position, reverse):
+        """
+        f1 >= v1 AND (f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...), with < for
+        descending fields. The redundant first term lets the database read
+        the index as a range instead of scanning it to evaluate the OR.
+        """
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            clause = Q(**{f'{self.fields[i]}__{self.lookup(field, reverse)}': position[i]})
+            for j in range(i):
+                clause &= Q(**{self.fields[j]: position[j]})
+            condition |= clause
+        return Q(**{f'{self.fields[0]}__{self.lookup(self.ordering[0], reverse)}e': position[0]}) & condition
+
+    @staticmethod
+    def lookup(field, reverse):
+        return 'lt' if field.startswith('-') != reverse else 'gt'
+
+    def encode_cursor(self, instance, reverse):
+        # value_to_string() keeps the full precision of datetimes
+        payload = {'p': [instance._meta.get_field(field).value_to_string(instance) for field in self.fields]}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        """Return (position, reverse); the first page has no position."""
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise Http404('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise Http404('Invalid cursor')
+        try:
+            position = [model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise Http404('Invalid cursor')
+        return position, reverse
@@ -0,0 +1,34 @@
+from django import template
+
+from django_blog.thumbnails import get_sizes, thumbnail_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(image, size='medium'):
+    """
+    URL of the thumbnail of `image` (an ImageField value) for `size`, either
+    a name from THUMBNAIL_SIZES or the pixels the image is displayed at,
+    which picks the smallest thumbnail at least that large:
+
+        <img src="{% thumbnail_url profile.profile_picture 64 %}" width="64" height="64">
+
+    Until the thumbnail is generated, or for a size that is neither, the
+    original's URL is returned, and '' when there is no image.
+    """
+    if not image:
+        return ''
+    sizes = get_sizes()
+    if size in sizes:
+        pixels = sizes[size]
+    else:
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            return image.url
+        pixels = next((value for value in sizes.values() if value >= size), max(sizes.values()))
+    name = thumbnail_name(image.name, pixels)
+    if not image.storage.exists(name):
+        return image.url
+    return image.storage.url(name)
@@ -1,3 +1,439 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from django_blog.thumbnails import thumbnail_name, wait_for_thumbnails
+
+from .feed import FEED_HEAD_VERSION_KEY
+from .forms import ProfileUpdateForm
+from .models import Post, Profile
+from .uploads import MAX_HEADER_SIZE, ImageUploadHandler, sniff_format
+
+
+@mock.patch('blog.views.POSTS_PER_PAGE', 3)
+class PostFeedTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [User.objects.create_user(f'author{i}') for i in range(2)]
+        cls.posts = [
+            Post.objects.create(title=f'Post {i}', content='Text', author=cls.authors[i % 2]) for i in range(8)
+        ]
+
+    def setUp(self):
+        # A cache of the tests' own, shared by its connections like the
+        # site's: cached fragments don't roll back with the test transactions
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, cursor=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('posts'), {'cursor': cursor} if cursor else {})
+        response.queries = len(context.captured_queries)
+        return response
+
+    def titles(self, response):
+        return [post.title for post in response.context['page']]
+
+    def test_pages_newest_first(self):
+        seen = []
+        response = self.get()
+        while True:
+            self.assertEqual(response.status_code, 200)
+            # The page and its authors in one query
+            self.assertEqual(response.queries, 1)
+            seen += self.titles(response)
+            if not response.context['page'].has_next:
+                break
+            response = self.get(response.context['page'].next_cursor)
+        self.assertEqual(seen, [f'Post {i}' for i in reversed(range(8))])
+
+        response = self.get(response.context['page'].previous_cursor)
+        self.assertEqual(self.titles(response), ['Post 4', 'Post 3', 'Post 2'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get('nope').status_code, 404)
+        self.assertEqual(self.get('eyJwIjpbIngiLCIxIl19').status_code, 404)
+
+    def test_pages_are_cached(self):
+        first = self.get()
+        self.assertContains(first, 'Post 7')
+        cached = self.get()
+        self.assertEqual(cached.queries, 0)
+        self.assertEqual(cached.content, first.content)
+
+    def test_new_post_only_refreshes_the_top_of_the_feed(self):
+        first = self.get()
+        self.get(first.context['page'].next_cursor)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Post 8', content='Text', author=self.authors[0])
+
+        response = self.get()
+        self.assertEqual(response.queries, 1)
+        self.assertEqual(self.titles(response), ['Post 8', 'Post 7', 'Post 6'])
+        # Older pages don't change and stay cached
+        self.assertEqual(self.get(first.context['page'].next_cursor).queries, 0)
+
+    def test_edits_and_deletes_refresh_every_page(self):
+        first = self.get()
+        cursor = first.context['page'].next_cursor
+        self.get(cursor)
+
+        self.posts[3].title = 'Edited'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[3].save()
+        response = self.get(cursor)
+        self.assertEqual(response.queries, 1)
+        self.assertEqual(self.titles(response), ['Post 4', 'Edited', 'Post 2'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[2].delete()
+        response = self.get(cursor)
+        self.assertEqual(self.titles(response), ['Post 4', 'Edited', 'Post 1'])
+
+    def test_pages_are_refreshed_after_commit(self):
+        self.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Post.objects.create(title='Post 8', content='Text', author=self.authors[0])
+            # A page rendered before the commit is cached under the old version
+            self.assertEqual(self.get().queries, 0)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.assertEqual(self.titles(self.get())[0], 'Post 8')
+
+    def test_writes_from_other_processes_refresh_pages(self):
+        self.get()
+        # Another process, with its own connection to the default cache,
+        # writes a post
+        other_process = caches.create_connection('default')
+        Post.objects.create(title='Post 8', content='Text', author=self.authors[0])
+        other_process.delete(FEED_HEAD_VERSION_KEY)
+        self.assertEqual(self.titles(self.get())[0], 'Post 8')
+
+
+def make_image(width=1600, height=1200, format='JPEG', mode='RGB'):
+    """An upload of random pixels, which compress badly, like a photo."""
+    image = Image.frombytes(mode, (width, height), os.urandom(width * height * len(mode)))
+    buffer = BytesIO()
+    image.save(buffer, format)
+    return SimpleUploadedFile(f'photo.{format.lower()}', buffer.getvalue(), content_type=f'image/{format.lower()}')
+
+
+class ThumbnailTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user('writer')
+
+    def upload(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = Profile.objects.create(user=self.user, profile_picture=make_image(**kwargs))
+        wait_for_thumbnails(timeout=30)
+        return profile
+
+    def render_tag(self, picture, size):
+        return Template('{% load thumbnails %}{% thumbnail_url picture size %}').render(
+            Context({'picture': picture, 'size': size})
+        )
+
+    def test_thumbnails_are_generated_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile = Profile.objects.create(user=self.user, profile_picture=make_image())
+        # Nothing happens while the request is running
+        storage = profile.profile_picture.storage
+        self.assertFalse(storage.exists(thumbnail_name(profile.profile_picture.name, 48)))
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        wait_for_thumbnails(timeout=30)
+        original_size = profile.profile_picture.size
+        for pixels in [48, 128, 256]:
+            name = thumbnail_name(profile.profile_picture.name, pixels)
+            with storage.open(name) as file, Image.open(file) as thumbnail:
+                self.assertEqual(thumbnail.size, (pixels, pixels))
+                self.assertEqual(thumbnail.format, 'JPEG')
+            self.assertLess(storage.size(name) * 10, original_size)
+
+    def test_transparent_png(self):
+        profile = self.upload(width=300, height=200, format='PNG', mode='RGBA')
+        name = thumbnail_name(profile.profile_picture.name, 128)
+        self.assertTrue(profile.profile_picture.storage.exists(name))
+
+    def test_saves_without_the_picture_dont_regenerate(self):
+        profile = self.upload(width=300, height=300)
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile.bio = 'Hello'
+            profile.save(update_fields=['bio'])
+            profile.save()
+        self.assertEqual(callbacks, [])
+
+    def test_thumbnail_url_tag(self):
+        with self.captureOnCommitCallbacks():
+            profile = Profile.objects.create(user=self.user, profile_picture=make_image(300, 300))
+        picture = profile.profile_picture
+        # The original until the thumbnails exist
+        self.assertEqual(self.render_tag(picture, 64), picture.url)
+
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.assertTrue(self.render_tag(picture, 64).endswith('_128.jpg'))
+        self.assertTrue(self.render_tag(picture, 48).endswith('_48.jpg'))
+        self.assertTrue(self.render_tag(picture, 1000).endswith('_256.jpg'))
+        self.assertTrue(self.render_tag(picture, 'small').endswith('_48.jpg'))
+        # Unknown size names fall back to the original
+        self.assertEqual(self.render_tag(picture, 'huge'), picture.url)
+        self.assertEqual(self.render_tag(None, 'small'), '')
+
+
+class ImageUploadTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user('writer', 'writer@example.com')
+        self.profile = Profile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def post(self, upload):
+        return self.client.post(reverse('profile'), {
+            'username': 'writer', 'email': 'writer@example.com', 'bio': 'Hi', 'profile_picture': upload,
+        })
+
+    def stream(self, data, chunk_size=64 * 1024):
+        """Feed `data` to a handler the way the multipart parser does."""
+        handler = ImageUploadHandler(RequestFactory().post('/'))
+        handler.new_file('profile_picture', 'photo.jpg', 'image/jpeg', None)
+        self.addCleanup(handler.file.close)
+        for start in range(0, len(data), chunk_size):
+            handler.receive_data_chunk(data[start:start + chunk_size], start)
+            self.assertLessEqual(len(handler.header), MAX_HEADER_SIZE)
+        return handler, handler.file_complete(len(data))
+
+    def test_valid_upload(self):
+        response = self.post(make_image(300, 200))
+        self.assertRedirects(response, reverse('profile'))
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.profile_picture.width, self.profile.profile_picture.height), (300, 200))
+
+    def test_rejects_files_that_are_not_images(self):
+        response = self.post(SimpleUploadedFile('photo.jpg', b'<?php echo "hi"; ?>' * 100))
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['p_form'], 'profile_picture', 'Upload a JPEG, PNG, GIF or WebP image.')
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.profile_picture)
+
+    @override_settings(PROFILE_IMAGE_MAX_DIMENSIONS=(100, 100))
+    def test_rejects_large_dimensions(self):
+        response = self.post(make_image(300, 50))
+        self.assertFormError(response.context['p_form'], 'profile_picture', 'The image must be at most 100x100 pixels.')
+
+    @override_settings(PROFILE_IMAGE_MAX_SIZE=100 * 1024)
+    def test_rejects_large_files_without_storing_them(self):
+        data = make_image(600, 600).read()
+        self.assertGreater(len(data), 200 * 1024)
+        with self.assertRaisesMessage(SkipFile, 'The image is larger than 100.0\xa0KB.'):
+            self.stream(data, chunk_size=16 * 1024)
+
+        response = self.post(make_image(600, 600))
+        self.assertFormError(response.context['p_form'], 'profile_picture', 'The image is larger than 100.0\xa0KB.')
+
+    def test_header_is_read_across_chunks(self):
+        data = make_image(40, 30, format='PNG').read()
+        handler, upload = self.stream(data, chunk_size=7)
+        self.assertEqual(handler.dimensions, (40, 30))
+        self.assertEqual(upload.size, len(data))
+
+    def test_header_size_is_bounded(self):
+        # A JPEG signature followed by bytes that never complete a header:
+        # buffering stops at MAX_HEADER_SIZE and the complete file is checked
+        handler, upload = self.stream(b'\xff\xd8\xff\xe1' + b'\x00' * (2 * MAX_HEADER_SIZE))
+        self.assertIsNone(upload)
+        self.assertEqual(handler.request.upload_errors, {'profile_picture': 'The file is not a valid image.'})
+
+    def test_header_larger_than_the_buffer(self):
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200)).save(buffer, 'JPEG', icc_profile=os.urandom(300 * 1024))
+        data = buffer.getvalue()
+        handler, upload = self.stream(data)
+        self.assertEqual(handler.dimensions, (300, 200))
+        self.assertEqual(upload.size, len(data))
+
+        with override_settings(PROFILE_IMAGE_MAX_DIMENSIONS=(100, 100)):
+            handler, upload = self.stream(data)
+        self.assertIsNone(upload)
+        self.assertEqual(
+            handler.request.upload_errors, {'profile_picture': 'The image must be at most 100x100 pixels.'}
+        )
+
+        response = self.post(SimpleUploadedFile('photo.jpg', data, content_type='image/jpeg'))
+        self.assertRedirects(response, reverse('profile'))
+
+    def test_truncated_image(self):
+        handler = ImageUploadHandler(RequestFactory().post('/'))
+        handler.new_file('profile_picture', 'photo.gif', 'image/gif', None)
+        handler.receive_data_chunk(b'GIF89a', 0)
+        self.assertIsNone(handler.file_complete(6))
+        self.assertEqual(handler.request.upload_errors, {'profile_picture': 'The file is not a valid image.'})
+
+    def test_sniff_format(self):
+        self.assertEqual(sniff_format(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'WEBP')
+        self.assertIsNone(sniff_format(b'RIFF\x00\x00\x00\x00WAVEfmt '))
+        self.assertEqual(sniff_format(b'\x89PNG\r\n\x1a\n\x00'), 'PNG')
+
+
+class PostCounterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer')
+        self.profile = Profile.objects.create(user=self.user)
+
+    def assertCounters(self, post_count, last_post):
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.post_count, post_count)
+        self.assertEqual(self.profile.last_published_at, last_post.published_date if last_post else None)
+
+    def post(self, title):
+        return Post.objects.create(title=title, content='Text', author=self.user)
+
+    def test_create_and_delete(self):
+        first = self.post('First')
+        self.assertCounters(1, first)
+        second = self.post('Second')
+        self.assertCounters(2, second)
+
+        second.delete()
+        self.assertCounters(1, first)
+        Post.objects.filter(author=self.user).delete()
+        self.assertCounters(0, None)
+
+    def test_edits_dont_count(self):
+        post = self.post('First')
+        post.title = 'Edited'
+        post.save()
+        self.assertCounters(1, post)
+
+    def test_counters_and_post_are_written_together(self):
+        with mock.patch('blog.models.Greatest', side_effect=DatabaseError('boom')):
+            with self.assertRaises(DatabaseError):
+                self.post('Lost')
+        self.assertFalse(Post.objects.exists())
+        self.assertCounters(0, None)
+
+    def test_first_post_creates_the_profile(self):
+        author = User.objects.create_user('newcomer')
+        Post.objects.bulk_create([Post(title='Imported', content='Text', author=author)])
+        post = Post.objects.create(title='First', content='Text', author=author)
+        profile = Profile.objects.get(user=author)
+        self.assertEqual((profile.post_count, profile.last_published_at), (2, post.published_date))
+
+    def test_migration_backfills_counters(self):
+        other = User.objects.create_user('other')
+        Post.objects.bulk_create(
+            [Post(title=f'Post {i}', content='Text', author=author) for i in range(2) for author in (self.user, other)]
+        )
+        latest = Post.objects.filter(author=self.user).latest('published_date')
+
+        migration = import_module('blog.migrations.0005_profile_post_counters')
+        migration.count_posts(apps, None)
+        self.assertCounters(2, latest)
+        self.assertEqual(Profile.objects.get(user=other).post_count, 2)
+
+    def test_reconcile_command(self):
+        other = User.objects.create_user('other')
+        other_profile = Profile.objects.create(user=other, post_count=5)
+        Post.objects.bulk_create([Post(title=f'Post {i}', content='Text', author=self.user) for i in range(3)])
+        latest = Post.objects.latest('published_date')
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as context:
+            call_command('reconcile_post_counters', stdout=out)
+        self.assertIn('Fixed the post counters of 2 profiles.', out.getvalue())
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in context.captured_queries), 1)
+        self.assertCounters(3, latest)
+        other_profile.refresh_from_db()
+        self.assertEqual(other_profile.post_count, 0)
+
+        call_command('reconcile_post_counters', stdout=out)
+        self.assertIn('Fixed the post counters of 0 profiles.', out.getvalue())
+
+    def test_profile_page_reads_no_post(self):
+        self.post('First')
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('profile'))
+        self.assertContains(response, '<td>1, latest on')
+        self.assertFalse(any('blog_post' in query['sql'] for query in context.captured_queries))
+
+
+class ProfileViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', 'writer@example.com')
+        self.profile = Profile.objects.create(user=self.user, bio='Hello')
+        self.client.force_login(self.user)
+
+    def test_get_runs_at_most_two_queries(self):
+        # The session, then the user joined with the profile
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('profile'))
+        self.assertContains(response, 'Hello')
+        self.assertLessEqual(len(context.captured_queries), 2)
+
+    def test_profile_is_created_when_missing(self):
+        self.profile.delete()
+        Post.objects.bulk_create([Post(title=f'Post {i}', content='Text', author=self.user) for i in range(3)])
+        latest = Post.objects.latest('published_date')
+
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual((profile.post_count, profile.last_published_at), (3, latest.published_date))
+        self.assertContains(response, '<td>3, latest on')
+
+    def test_only_changed_fields_are_written(self):
+        data = {'username': 'writer', 'email': 'writer@example.com', 'bio': 'Updated'}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('profile'), data)
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertRedirects(response, reverse('profile'))
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"bio"', updates[0])
+        self.assertNotIn('"post_count"', updates[0])
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(reverse('profile'), data)
+        self.assertFalse(any(query['sql'].startswith('UPDATE') for query in context.captured_queries))
+
+    def test_form_keeps_counters_written_meanwhile(self):
+        profile = Profile.objects.get(user=self.user)
+        Post.objects.create(title='Post', content='Text', author=self.user)
+        form = ProfileUpdateForm({'bio': 'Updated'}, instance=profile)
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.bio, self.profile.post_count), ('Updated', 1))
@@ -0,0 +1,147 @@
+"""
+Streaming validation of image uploads.
+
+ImageUploadHandler writes image uploads to a temporary file chunk by
+chunk, like Django's TemporaryFileUploadHandler, and checks them while
+they arrive:
+
+- the first bytes must be the signature of a JPEG, PNG, GIF or WebP file
+- the width and height are read from the image header (Image.open() only
+  parses the header, no pixel is decoded) and must be within
+  PROFILE_IMAGE_MAX_DIMENSIONS
+- the file must not grow over PROFILE_IMAGE_MAX_SIZE bytes
+
+A file failing a check is dropped right away: the rest of it is read off
+the connection and discarded, never written. At most one chunk plus
+MAX_HEADER_SIZE bytes of header are in memory per upload, whatever the
+file size. Headers carrying more metadata than that (a large ICC profile,
+say) stop being buffered; their dimensions are read once the file is
+complete, by Image.open() on the temporary file, which still only parses
+the header.
+
+The reasons are kept in request.upload_errors ({field name: message});
+add_upload_errors() puts them on the form. The handler has to be installed
+before the request body is read, i.e. before CsrfViewMiddleware looks at
+request.POST, see views.profile.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+MAX_HEADER_SIZE = 256 * 1024
+
+IMAGE_SIGNATURES = {
+    'JPEG': [b'\xff\xd8\xff'],
+    'PNG': [b'\x89PNG\r\n\x1a\n'],
+    'GIF': [b'GIF87a', b'GIF89a'],
+    'WEBP': [b'RIFF'],
+}
+
+
+def sniff_format(data):
+    """The image format named by the signature at the start of `data`, or None."""
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if any(data.startswith(signature) for signature in signatures):
+            if image_format == 'WEBP' and data[8:12] != b'WEBP':
+                continue
+            return image_format
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Validate image uploads while streaming them to disk (module docstring)."""
+
+    def __init__(self, request=None, field_names=('profile_picture',)):
+        super().__init__(request)
+        self.field_names = field_names
+        self.max_size = getattr(settings, 'PROFILE_IMAGE_MAX_SIZE', 5 * 1024 * 1024)
+        self.max_dimensions = getattr(settings, 'PROFILE_IMAGE_MAX_DIMENSIONS', (4096, 4096))
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = {}
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.checking = field_name in self.field_names
+        self.header = b''
+        self.header_in_file = False
+        self.image_format = None
+        self.dimensions = None
+
+    def reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.checking:
+            if start + len(raw_data) > self.max_size:
+                self.reject(f'The image is larger than {filesizeformat(self.max_size)}.')
+            if self.dimensions is None and not self.header_in_file:
+                self.header += raw_data[:MAX_HEADER_SIZE - len(self.header)]
+                self.check_header(complete=False)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, complete):
+        """
+        Check the signature and dimensions in the bytes received so far. With
+        complete=False, a header that is still too short to parse is fine.
+        """
+        if len(self.header) < 12 and not complete:
+            return
+        self.image_format = sniff_format(self.header)
+        if self.image_format is None:
+            self.reject('Upload a JPEG, PNG, GIF or WebP image.')
+        if self.check_dimensions(BytesIO(self.header)):
+            return
+        if complete:
+            self.reject('The file is not a valid image.')
+        if len(self.header) >= MAX_HEADER_SIZE:
+            # Still no dimensions: read them from the file once complete
+            self.header = b''
+            self.header_in_file = True
+
+    def check_dimensions(self, fp):
+        """
+        Read the dimensions from the image header in `fp` and check them.
+        Returns False when the header can't be parsed.
+        """
+        from PIL import Image
+
+        try:
+            with Image.open(fp, formats=[self.image_format]) as image:
+                self.dimensions = image.size
+        except Image.DecompressionBombError:
+            self.dimensions = (float('inf'), float('inf'))
+        except (OSError, SyntaxError, ValueError):
+            return False
+        width, height = self.dimensions
+        max_width, max_height = self.max_dimensions
+        if width > max_width or height > max_height:
+            self.reject(f'The image must be at most {max_width}x{max_height} pixels.')
+        # Parsed: the header isn't needed anymore
+        self.header = b''
+        return True
+
+    def file_complete(self, file_size):
+        if self.checking and self.dimensions is None:
+            try:
+                if self.header_in_file:
+                    self.file.flush()
+                    self.file.seek(0)
+                    if not self.check_dimensions(self.file):
+                        self.reject('The file is not a valid image.')
+                else:
+                    self.check_header(complete=True)
+            except SkipFile:
+                self.file.close()
+                return None
+        return super().file_complete(file_size)
+
+
+def add_upload_errors(form, request):
+    """Add the reasons uploads were rejected to `form`'s errors."""
+    for field_name, message in getattr(request, 'upload_errors', {}).items():
+        if field_name in form.fields:
+            form.add_error(field_name, message)
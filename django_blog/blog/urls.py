@@ -1,10 +1,14 @@
-from django.urls import path,
+from django.urls import path
 from . import views
 from django.contrib.auth import views as auth_views
 
 urlpatterns = [
+    path('', views.post_feed, name='home'),
+    path('posts/', views.post_feed, name='posts'),
     path('register/', views.register, name='register'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(template_name='logout.html'), name='logout'),
     path('profile/', views.profile, name='profile'),
+    path('password/', auth_views.PasswordChangeView.as_view(), name='password_change'),
+    path('password/done/', auth_views.PasswordChangeDoneView.as_view(), name='password_change_done'),
 ]
\ No newline at end of file
@@ -4,6 +4,14 @@ from .forms import CustomUserCreationForm
 from django.contrib.auth import login as auth_login, logout as auth_logout
 from django.contrib import messages
 from .forms import UserUpdateForm, ProfileUpdateForm
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from .feed import get_feed_cache_timeout, get_feed_version
+from .models import Post, Profile, get_or_create_profile
+from .pagination import KeysetPaginator
+from .uploads import ImageUploadHandler, add_upload_errors
+
+POSTS_PER_PAGE = 20
 
 # Create your views here.
 
@@ -22,23 +30,73 @@ def register(request):
 
 #profile view:
 @login_required
+@csrf_exempt
 def profile(request):
+    # Pictures are validated while they stream in (see uploads.py). The
+    # handler must be set before the body is read, so the CSRF check that
+    # reads it runs afterwards, in _profile.
+    request.upload_handlers = [ImageUploadHandler(request)]
+    return _profile(request)
+
+
+def get_profile(user):
+    """
+    The user's profile, loaded along with the user by ProfileModelBackend;
+    created, with the counters of the user's posts, for users registered
+    without one.
+    """
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        user.profile, _ = get_or_create_profile(user.pk)
+        return user.profile
+
+
+@csrf_protect
+def _profile(request):
+    profile = get_profile(request.user)
     if request.method == 'POST':
         u_form = UserUpdateForm(request.POST, instance=request.user)
-        p_form = ProfileUpdateForm(request.POST, request.FILES, instance=request.user.profile) 
+        p_form = ProfileUpdateForm(request.POST, request.FILES, instance=profile)
+        add_upload_errors(p_form, request)
 
         if u_form.is_valid() and p_form.is_valid():
             u_form.save()
             p_form.save()
             messages.success(request, 'Your profile has been updated!')
-            return redirect('registration\profile')
-        else:
-            u_form = UserUpdateForm(instance=request.user)
-            p_form = ProfileUpdateForm(instance=request.user.profile)
+            return redirect('profile')
+    else:
+        u_form = UserUpdateForm(instance=request.user)
+        p_form = ProfileUpdateForm(instance=profile)
 
     context = {
-        'u_form': UserUpdateForm(instance=request.user),
-        'p_form': ProfileUpdateForm(instance=request.user.profile)'
+        'u_form': u_form,
+        'p_form': p_form,
     }
 
-    return render(request, 'registration\profile.html', context)
\ No newline at end of file
+    return render(request, 'blog/profile.html', context)
+
+#post feed view:
+def post_feed(request):
+    """
+    Newest posts first, POSTS_PER_PAGE at a time with keyset pagination
+    (?cursor=), each post with its author in the same query.
+
+    Every page is cached as a template fragment keyed on its cursor and the
+    feed version (see feed.py). The page is only read from the database
+    when the fragment isn't cached: the template gets it as a lazy object.
+    """
+    paginator = KeysetPaginator(ordering=('-published_date', '-id'), page_size=POSTS_PER_PAGE)
+    cursor = request.GET.get(paginator.cursor_param, '')
+    # Checks the cursor now, so an invalid one is a 404 before rendering
+    _, reverse = paginator.decode_cursor(cursor, Post)
+    posts = Post.objects.select_related('author')
+
+    context = {
+        'page': SimpleLazyObject(lambda: paginator.paginate(posts, request)),
+        'cursor': cursor,
+        # Pages after a next cursor don't change when a post is added
+        'feed_version': get_feed_version(head=not cursor or reverse),
+        'feed_cache_timeout': get_feed_cache_timeout(),
+    }
+    return render(request, 'blog/post_feed.html', context)
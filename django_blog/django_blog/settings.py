@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import sys
 from pathlib import Path
 import os
 
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'django_blog.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -142,5 +144,60 @@ TEMPLATES = [
     },
 ]
 
+# Loads the user's Profile along with the user (see blog/backends.py)
+AUTHENTICATION_BACKENDS = ['blog.backends.ProfileModelBackend']
+
 LOGIN_REDIRECT_URL = 'profile'
-LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login'
+
+# Per-request SQL instrumentation (see django_blog/middleware.py):
+# query count and DB time in the Server-Timing header and the log
+QUERY_INSTRUMENTATION = DEBUG
+
+# Raise instead of logging a warning when a view exceeds its query budget
+QUERY_BUDGET_STRICT = 'test' in sys.argv
+
+# The default cache holds the rendered feed pages and the version tokens
+# that invalidate them (see blog/feed.py), so every process of the site
+# must share it: with a per-process (local memory) cache, a post written
+# through one process would leave the others serving stale pages. Set
+# CACHE_URL to a Redis (redis://host:6379/0) or Memcached
+# (memcached://host:11211) server to share it between hosts. Without it,
+# the cache is a directory of the project, shared by the processes of this
+# host; not the system temporary directory, where anyone could plant
+# entries (pickles) the cache would load.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+elif CACHE_URL.startswith('memcached://'):
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL.removeprefix('memcached://'),
+    }
+else:
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        # Created readable by the owner only
+        'LOCATION': BASE_DIR / 'cache',
+    }
+
+CACHES = {'default': DEFAULT_CACHE}
+
+# Seconds a rendered page of the post feed stays cached (see blog/feed.py)
+FEED_CACHE_TIMEOUT = 600
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Profile picture thumbnails, generated in the background after upload
+# (see django_blog/thumbnails.py)
+THUMBNAIL_SIZES = {'small': 48, 'medium': 128, 'large': 256}
+THUMBNAIL_WORKERS = 2
+
+# Profile picture uploads over these limits are rejected while they stream
+# in, before they are saved (see blog/uploads.py)
+PROFILE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+PROFILE_IMAGE_MAX_DIMENSIONS = (4096, 4096)